@@ -1,84 +1,56 @@
 import { NextResponse } from 'next/server'
-import { MongoClient } from 'mongodb'
-import bcrypt from 'bcryptjs'
-import jwt from 'jsonwebtoken'
 import { v4 as uuidv4 } from 'uuid'
+import { connectDB, initializeDatabase, pingDB, poolStats } from '@/lib/db'
+import {
+  authenticate,
+  issueSession,
+  loginFailureLimiter,
+  loginIpLimiter,
+  refreshSession,
+  revocationStats,
+  revokeRefreshToken,
+  revokeUser,
+  userCache
+} from '@/lib/auth'
+import { PasswordPoolBusyError, comparePassword, hashPassword, passwordPoolStats } from '@/lib/passwords'
+import { clientIp } from '@/lib/ratelimit'
+import { createEventStream, eventStats, publishReservationEvent, startEventSource } from '@/lib/events'
+import { getResourceCatalog, resourceCacheStats } from '@/lib/resources'
+import { decodeCursor, keysetFilter, paginate, parseLimit } from '@/lib/pagination'
+import { Router } from '@/lib/router'
+import { MAX_ANALYTICS_DAYS, rebuildUsage, recordUsage, usageReport } from '@/lib/analytics'
+import { ARCHIVE_AFTER_DAYS, archiveStats, runArchiveJob } from '@/lib/archive'
+import {
+  QUEUED_RESOURCE_TYPE,
+  enqueueRequest,
+  promoteWaitlist,
+  validateQueueRequest
+} from '@/lib/queue'
+import { measureRequest, recordRequest, renderMetrics } from '@/lib/metrics'
+import {
+  MAX_AVAILABILITY_DAYS,
+  MAX_BULK_SLOTS,
+  MAX_DURATION_HOURS,
+  ARCHIVE_COLLECTION,
+  RESERVATION_SORT_FIELDS,
+  checkReservationConflict,
+  claimInterval,
+  claimIntervals,
+  expandRecurrence,
+  findAvailability,
+  findBatchConflicts,
+  listReservations,
+  parseTimeBound,
+  reconcileLedger,
+  releaseIntervals,
+  validateSlot
+} from '@/lib/reservations'
 
-const client = new MongoClient(process.env.MONGO_URL)
-const JWT_SECRET = process.env.JWT_SECRET
-
-// Database connection
-async function connectDB() {
-  if (!client.topology || !client.topology.isConnected()) {
-    await client.connect()
-  }
-  return client.db(process.env.DB_NAME)
-}
-
-// Initialize database with default data
-async function initializeDatabase() {
-  try {
-    const db = await connectDB()
-    
-    // Check if admin user exists
-    const adminExists = await db.collection('users').findOne({ username: 'admin' })
-    
-    if (!adminExists) {
-      // Create default admin user
-      const hashedPassword = await bcrypt.hash('admin', 10)
-      await db.collection('users').insertOne({
-        id: uuidv4(),
-        username: 'admin',
-        password: hashedPassword,
-        role: 'admin',
-        createdAt: new Date()
-      })
-      console.log('Default admin user created')
-    }
-
-    // Check if resources exist
-    const resourceCount = await db.collection('resources').countDocuments()
-    
-    if (resourceCount === 0) {
-      // Create default resources
-      const defaultResources = [
-        {
-          id: uuidv4(),
-          name: 'Athéna',
-          type: 'meeting_room',
-          createdAt: new Date()
-        },
-        {
-          id: uuidv4(),
-          name: 'Héra',
-          type: 'meeting_room',
-          createdAt: new Date()
-        },
-        {
-          id: uuidv4(),
-          name: 'Hephaïstos',
-          type: 'supercomputer',
-          createdAt: new Date()
-        },
-        {
-          id: uuidv4(),
-          name: 'Artémis',
-          type: 'supercomputer',
-          createdAt: new Date()
-        }
-      ]
-      
-      await db.collection('resources').insertMany(defaultResources)
-      console.log('Default resources created')
-    }
-  } catch (error) {
-    console.error('Database initialization error:', error)
-  }
-}
+const METRICS_TOKEN = process.env.METRICS_TOKEN
 
 // Auth middleware
 function authMiddleware(handler) {
-  return async (request, { params }) => {
+  return async (request, context) => {
     try {
       const authHeader = request.headers.get('authorization')
       if (!authHeader || !authHeader.startsWith('Bearer ')) {
@@ -86,17 +58,15 @@ function authMiddleware(handler) {
       }
 
       const token = authHeader.substring(7)
-      const decoded = jwt.verify(token, JWT_SECRET)
-      
       const db = await connectDB()
-      const user = await db.collection('users').findOne({ id: decoded.userId })
+      const user = await authenticate(db, token)
       
       if (!user) {
         return NextResponse.json({ error: 'Invalid token' }, { status: 401 })
       }
 
-      request.user = { id: user.id, username: user.username, role: user.role }
-      return handler(request, { params })
+      request.user = { ...user }
+      return handler(request, context)
     } catch (error) {
       return NextResponse.json({ error: 'Invalid token' }, { status: 401 })
     }
@@ -105,314 +75,965 @@ function authMiddleware(handler) {
 
 // Admin middleware
 function adminMiddleware(handler) {
-  return authMiddleware(async (request, { params }) => {
+  return authMiddleware(async (request, context) => {
     if (request.user.role !== 'admin') {
       return NextResponse.json({ error: 'Admin access required' }, { status: 403 })
     }
-    return handler(request, { params })
+    return handler(request, context)
   })
 }
 
-// Check reservation conflicts
-async function checkReservationConflict(db, resourceId, date, startTime, duration, excludeReservationId = null) {
-  const startDateTime = new Date(`${date}T${startTime}:00`)
-  const endDateTime = new Date(startDateTime.getTime() + duration * 60 * 60 * 1000)
+function tooManyRequests(retryAfter) {
+  return NextResponse.json(
+    { error: 'Too many login attempts, please try again later' },
+    { status: 429, headers: { 'Retry-After': String(retryAfter) } }
+  )
+}
+
+function serverBusy() {
+  return NextResponse.json(
+    { error: 'Server busy, please try again' },
+    { status: 503, headers: { 'Retry-After': '1' } }
+  )
+}
+
+// Whether the request's If-None-Match already covers the given ETag
+function etagMatches(request, etag) {
+  const header = request.headers.get('if-none-match')
+  if (!header) return false
+  return header.split(',').some((tag) => {
+    const value = tag.trim()
+    return value === '*' || value.replace(/^W\//, '') === etag
+  })
+}
+
+// Parse from/to/duration query parameters of the availability endpoints.
+// `to` defaults to the end of the `from` day; `duration` is in hours.
+function parseAvailabilityQuery(url) {
+  const from = parseTimeBound(url.searchParams.get('from'))
+  const to = url.searchParams.get('to')
+    ? parseTimeBound(url.searchParams.get('to'), true)
+    : parseTimeBound(url.searchParams.get('from')?.split('T')[0], true)
+  const duration = parseFloat(url.searchParams.get('duration') || '0')
+
+  if (!Number.isFinite(from) || !Number.isFinite(to) || to <= from) {
+    return { error: 'Valid from and to are required (YYYY-MM-DD or YYYY-MM-DDTHH:MM)' }
+  }
+  if (to - from > MAX_AVAILABILITY_DAYS * 24 * 60) {
+    return { error: `Range cannot exceed ${MAX_AVAILABILITY_DAYS} days` }
+  }
+  if (!Number.isFinite(duration) || duration < 0 || duration > MAX_DURATION_HOURS) {
+    return { error: 'Invalid duration' }
+  }
+
+  return { from, to, minDuration: Math.round(duration * 60) }
+}
+
+// Parse cursor/limit/from/to/archived of the reservation listings. The
+// archive is read only with archived=true.
+function parseReservationQuery(url) {
+  const from = url.searchParams.get('from')
+  const to = url.searchParams.get('to')
+  const cursor = url.searchParams.get('cursor')
+  const after = cursor ? decodeCursor(cursor, RESERVATION_SORT_FIELDS.length) : null
+
+  if ([from, to].some((date) => date && !/^\d{4}-\d{2}-\d{2}$/.test(date))) {
+    return { error: 'from and to must be dates (YYYY-MM-DD)' }
+  }
+  if (cursor && !after) {
+    return { error: 'Invalid cursor' }
+  }
+
+  return { from, to, after, limit: parseLimit(url), archived: url.searchParams.get('archived') === 'true' }
+}
+
+// JSON array response for one page; the next page's cursor, if any, is
+// returned in the X-Next-Cursor header
+function pageResponse({ items, nextCursor }) {
+  return NextResponse.json(items, {
+    headers: nextCursor ? { 'X-Next-Cursor': nextCursor } : {}
+  })
+}
+
+// Health check: database round trip and connection pool usage
+async function healthCheck() {
+  try {
+    const latencyMs = await pingDB()
+    return NextResponse.json({ status: 'ok', db: { latencyMs }, pool: poolStats() })
+  } catch (error) {
+    return NextResponse.json(
+      { status: 'error', db: { error: error.message }, pool: poolStats() },
+      { status: 503 }
+    )
+  }
+}
+
+// Prometheus metrics: request latency, status codes and database usage per
+// route, plus cache, pool and subscriber gauges. Requires
+// `Authorization: Bearer $METRICS_TOKEN` when METRICS_TOKEN is set.
+async function getMetrics(request) {
+  if (METRICS_TOKEN && request.headers.get('authorization') !== `Bearer ${METRICS_TOKEN}`) {
+    return NextResponse.json({ error: 'Invalid metrics token' }, { status: 401 })
+  }
+
+  const users = userCache.stats()
+  const resources = resourceCacheStats()
+  const db = poolStats()
+  const passwords = passwordPoolStats()
+  const events = eventStats()
+  const cacheSamples = (field) => [[{ cache: 'users' }, users[field]], [{ cache: 'resources' }, resources[field]]]
+
+  const body = renderMetrics({
+    cache_hits_total: { help: 'In-process cache hits', type: 'counter', samples: cacheSamples('hits') },
+    cache_misses_total: { help: 'In-process cache misses', type: 'counter', samples: cacheSamples('misses') },
+    cache_hit_ratio: { help: 'In-process cache hit rate since start', samples: cacheSamples('hitRate') },
+    mongodb_pool_connections: {
+      help: 'MongoDB connection pool connections',
+      samples: [[{ state: 'open' }, db.open], [{ state: 'checked_out' }, db.checkedOut], [{ state: 'waiting' }, db.waitQueue]]
+    },
+    password_pool_jobs: {
+      help: 'Password hashing jobs running or queued',
+      samples: [[{ state: 'busy' }, passwords.busy], [{ state: 'queued' }, passwords.queued]]
+    },
+    event_subscribers: { help: 'Open live update streams', samples: [[{}, events.subscribers]] }
+  })
+
+  return new NextResponse(body, {
+    headers: { 'Content-Type': 'text/plain; version=0.0.4; charset=utf-8' }
+  })
+}
+
+// Auth endpoints
+
+async function getProfile(request) {
+  return NextResponse.json({
+    id: request.user.id,
+    username: request.user.username,
+    role: request.user.role
+  })
+}
+
+async function login(request) {
+  const { username, password } = await request.json()
+  
+  if (!username || !password) {
+    return NextResponse.json({ error: 'Username and password required' }, { status: 400 })
+  }
+  
+  // Throttle before any bcrypt work so brute force cannot saturate CPU.
+  // Failures count per username and client, so nobody can lock another
+  // client out of an account.
+  const ip = clientIp(request)
+  const ipLimit = loginIpLimiter.hit(ip)
+  if (!ipLimit.allowed) {
+    return tooManyRequests(ipLimit.retryAfter)
+  }
+  const failureKey = `${username}|${ip}`
+  const failureLimit = loginFailureLimiter.check(failureKey)
+  if (!failureLimit.allowed) {
+    return tooManyRequests(failureLimit.retryAfter)
+  }
+  
+  const db = await connectDB()
+  const user = await db.collection('users').findOne({ username })
+  
+  let valid = false
+  try {
+    valid = !!user && await comparePassword(password, user.password)
+  } catch (error) {
+    if (error instanceof PasswordPoolBusyError) return serverBusy()
+    throw error
+  }
+  
+  if (!valid) {
+    loginFailureLimiter.hit(failureKey)
+    return NextResponse.json({ error: 'Invalid credentials' }, { status: 401 })
+  }
+  loginFailureLimiter.reset(failureKey)
+  
+  return NextResponse.json(await issueSession(db, user))
+}
+
+// Trade a refresh token for a new access and refresh token pair
+async function refresh(request) {
+  const { refreshToken } = await request.json()
+  
+  if (!refreshToken) {
+    return NextResponse.json({ error: 'Refresh token required' }, { status: 400 })
+  }
+  
+  const db = await connectDB()
+  const session = await refreshSession(db, refreshToken)
+  if (!session) {
+    return NextResponse.json({ error: 'Invalid refresh token' }, { status: 401 })
+  }
+  
+  return NextResponse.json(session)
+}
+
+// Revoke the refresh token; the access token lapses on its own
+async function logout(request) {
+  const { refreshToken } = await request.json().catch(() => ({}))
   
-  const query = {
+  if (refreshToken) {
+    const db = await connectDB()
+    await revokeRefreshToken(db, refreshToken)
+  }
+  
+  return NextResponse.json({ message: 'Logged out' })
+}
+
+// Resource endpoints
+
+async function listResources(request) {
+  const db = await connectDB()
+  const catalog = await getResourceCatalog(db)
+  const headers = { ETag: catalog.etag, 'Cache-Control': 'private, no-cache' }
+  
+  if (etagMatches(request, catalog.etag)) {
+    return new NextResponse(null, { status: 304, headers })
+  }
+  
+  return new NextResponse(catalog.body, {
+    headers: { ...headers, 'Content-Type': 'application/json' }
+  })
+}
+
+// Free slots of every resource (calendar view)
+async function getAllAvailability(request, { url }) {
+  const query = parseAvailabilityQuery(url)
+  if (query.error) {
+    return NextResponse.json({ error: query.error }, { status: 400 })
+  }
+  
+  const db = await connectDB()
+  const catalog = await getResourceCatalog(db)
+  const availability = await findAvailability(db, [...catalog.byId.keys()], query.from, query.to, query.minDuration)
+  
+  return NextResponse.json(catalog.resources.map((resource) => ({
+    resourceId: resource.id,
+    name: resource.name,
+    type: resource.type,
+    free: availability[resource.id]
+  })))
+}
+
+// Free slots of one resource
+async function getResourceAvailability(request, { params, url }) {
+  const query = parseAvailabilityQuery(url)
+  if (query.error) {
+    return NextResponse.json({ error: query.error }, { status: 400 })
+  }
+  
+  const db = await connectDB()
+  const catalog = await getResourceCatalog(db)
+  if (!catalog.byId.has(params.id)) {
+    return NextResponse.json({ error: 'Resource not found' }, { status: 404 })
+  }
+  
+  const availability = await findAvailability(db, [params.id], query.from, query.to, query.minDuration)
+  return NextResponse.json({ resourceId: params.id, free: availability[params.id] })
+}
+
+// Live reservation updates as Server-Sent Events, optionally for a
+// comma-separated list of resourceId
+async function streamEvents(request, { url }) {
+  const db = await connectDB()
+  await startEventSource(db)
+  
+  const resourceIds = url.searchParams.get('resourceId')?.split(',').filter(Boolean) || null
+  const response = createEventStream(db, request.user, { resourceIds, signal: request.signal })
+  if (!response) {
+    return NextResponse.json({ error: 'Too many event subscribers' }, { status: 503 })
+  }
+  return response
+}
+
+// Reservation endpoints
+
+async function listOwnReservations(request, { url }) {
+  const query = parseReservationQuery(url)
+  if (query.error) {
+    return NextResponse.json({ error: query.error }, { status: 400 })
+  }
+  
+  const db = await connectDB()
+  
+  // Get user's reservations with resource details
+  const page = await listReservations(db, { userId: request.user.id }, query)
+  return pageResponse(page)
+}
+
+// All reservations, optionally for one user (admin only)
+async function listAllReservations(request, { url }) {
+  const query = parseReservationQuery(url)
+  if (query.error) {
+    return NextResponse.json({ error: query.error }, { status: 400 })
+  }
+  
+  const db = await connectDB()
+  const userId = url.searchParams.get('userId')
+  const page = await listReservations(db, userId ? { userId } : {}, query)
+  return pageResponse(page)
+}
+
+async function createReservation(request) {
+  const { resourceId, date, startTime, duration } = await request.json()
+  
+  if (!resourceId) {
+    return NextResponse.json({ error: 'All fields are required' }, { status: 400 })
+  }
+  
+  const { start, end, error } = validateSlot({ date, startTime, duration })
+  if (error) {
+    return NextResponse.json({ error }, { status: 400 })
+  }
+  
+  const db = await connectDB()
+  
+  // Check if resource exists
+  const catalog = await getResourceCatalog(db)
+  if (!catalog.byId.has(resourceId)) {
+    return NextResponse.json({ error: 'Resource not found' }, { status: 404 })
+  }
+  
+  // Check for conflicts
+  const hasConflict = await checkReservationConflict(db, resourceId, date, startTime, parseFloat(duration))
+  if (hasConflict) {
+    return NextResponse.json({ error: 'Time slot already reserved' }, { status: 409 })
+  }
+  
+  // Create reservation
+  const reservation = {
+    id: uuidv4(),
+    userId: request.user.id,
     resourceId,
     date,
-    $or: [
-      {
-        $and: [
-          { startTime: { $lte: startTime } },
-          { $expr: { $gte: [{ $dateFromString: { dateString: { $concat: ["$date", "T", "$startTime", ":00"] } } }, startDateTime] } }
-        ]
-      },
-      {
-        $and: [
-          { startTime: { $gte: startTime } },
-          { $expr: { $lt: [{ $dateFromString: { dateString: { $concat: ["$date", "T", "$startTime", ":00"] } } }, endDateTime] } }
-        ]
-      }
-    ]
+    startTime,
+    duration,
+    start,
+    end,
+    createdAt: new Date()
   }
   
-  if (excludeReservationId) {
-    query.id = { $ne: excludeReservationId }
+  // Claim the slot atomically; a concurrent overlapping booking loses here
+  if (!await claimInterval(db, reservation)) {
+    return NextResponse.json({ error: 'Time slot already reserved' }, { status: 409 })
   }
   
-  // Simplified conflict check - check if any reservation overlaps with the requested time
-  const existingReservations = await db.collection('reservations').find({
-    resourceId,
-    date
-  }).toArray()
-  
-  for (const reservation of existingReservations) {
-    if (excludeReservationId && reservation.id === excludeReservationId) continue
-    
-    const existingStart = new Date(`${reservation.date}T${reservation.startTime}:00`)
-    const existingEnd = new Date(existingStart.getTime() + parseFloat(reservation.duration) * 60 * 60 * 1000)
-    
-    // Check if there's any overlap
-    if (startDateTime < existingEnd && endDateTime > existingStart) {
-      return true // Conflict found
-    }
+  try {
+    await db.collection('reservations').insertOne(reservation)
+  } catch (error) {
+    await releaseIntervals(db, [reservation])
+    throw error
   }
+  await recordUsage(db, [reservation])
+  publishReservationEvent('reservation.created', reservation)
   
-  return false // No conflict
+  return NextResponse.json(reservation, { status: 201 })
 }
 
-export async function GET(request, { params }) {
-  await initializeDatabase()
+// Bulk reservation endpoint: a list of slots or a recurrence rule.
+// With atomic: true either every slot is booked or none is.
+async function createReservationsBulk(request) {
+  const { resourceId, slots, recurrence, atomic = false } = await request.json()
   
-  const path = params.path?.join('/') || ''
-  const url = new URL(request.url)
+  const requested = recurrence
+    ? expandRecurrence(recurrence)
+    : Array.isArray(slots) ? slots : null
+  if (!requested || requested.length === 0) {
+    return NextResponse.json({ error: 'A list of slots or a valid recurrence is required' }, { status: 400 })
+  }
+  if (requested.length > MAX_BULK_SLOTS) {
+    return NextResponse.json({ error: `At most ${MAX_BULK_SLOTS} slots per request` }, { status: 400 })
+  }
   
-  try {
-    // Auth endpoints
-    if (path === 'auth/profile') {
-      return authMiddleware(async (request) => {
-        return NextResponse.json({
-          id: request.user.id,
-          username: request.user.username,
-          role: request.user.role
-        })
-      })(request, { params })
-    }
-    
-    // Resources endpoint
-    if (path === 'resources') {
-      return authMiddleware(async (request) => {
-        const db = await connectDB()
-        const resources = await db.collection('resources').find({}).toArray()
-        return NextResponse.json(resources)
-      })(request, { params })
+  const db = await connectDB()
+  const catalog = await getResourceCatalog(db)
+  const createdAt = new Date()
+  
+  // Validate every slot, then check all conflicts with one query
+  const results = []
+  const candidates = []
+  for (const slot of requested) {
+    if (!slot || typeof slot !== 'object' || Array.isArray(slot)) {
+      results.push({ slot, status: 400, error: 'Each slot must be an object' })
+      continue
     }
-    
-    // Reservations endpoint
-    if (path === 'reservations') {
-      return authMiddleware(async (request) => {
-        const db = await connectDB()
-        
-        // Get user's reservations with resource details
-        const reservations = await db.collection('reservations').aggregate([
-          { $match: { userId: request.user.id } },
-          {
-            $lookup: {
-              from: 'resources',
-              localField: 'resourceId',
-              foreignField: 'id',
-              as: 'resource'
-            }
-          },
-          { $unwind: '$resource' },
-          { $sort: { date: 1, startTime: 1 } }
-        ]).toArray()
-        
-        return NextResponse.json(reservations)
-      })(request, { params })
+    const slotResourceId = slot.resourceId || resourceId
+    const { start, end, error } = validateSlot(slot)
+    if (error || !slotResourceId) {
+      results.push({ ...slot, status: 400, error: error || 'All fields are required' })
+    } else if (!catalog.byId.has(slotResourceId)) {
+      results.push({ ...slot, status: 404, error: 'Resource not found' })
+    } else {
+      const reservation = {
+        id: uuidv4(),
+        userId: request.user.id,
+        resourceId: slotResourceId,
+        date: slot.date,
+        startTime: slot.startTime,
+        duration: slot.duration,
+        start,
+        end,
+        createdAt
+      }
+      results.push({ ...slot, resourceId: slotResourceId, status: 201, reservation })
+      candidates.push(reservation)
     }
-    
-    // Users endpoint (admin only)
-    if (path === 'users') {
-      return adminMiddleware(async (request) => {
-        const db = await connectDB()
-        const users = await db.collection('users').find({}, { projection: { password: 0 } }).toArray()
-        return NextResponse.json(users)
-      })(request, { params })
+  }
+  
+  const conflicts = await findBatchConflicts(db, candidates)
+  for (const result of results) {
+    if (result.reservation && conflicts.has(candidates.indexOf(result.reservation))) {
+      Object.assign(result, { status: 409, error: 'Time slot already reserved' })
     }
-    
-    return NextResponse.json({ error: 'Not found' }, { status: 404 })
-    
-  } catch (error) {
-    console.error('GET Error:', error)
-    return NextResponse.json({ error: 'Internal server error' }, { status: 500 })
   }
-}
-
-export async function POST(request, { params }) {
-  await initializeDatabase()
   
-  const path = params.path?.join('/') || ''
+  const respond = () => {
+    const created = results.filter((result) => result.status === 201).length
+    const status = created === results.length ? 201
+      : created > 0 ? 207
+      : results.some((result) => result.status === 409) ? 409 : 400
+    return NextResponse.json({
+      created,
+      results: results.map(({ reservation, ...result }) => (
+        result.status === 201 ? { ...result, reservation } : result
+      ))
+    }, { status })
+  }
   
-  try {
-    // Login endpoint
-    if (path === 'auth/login') {
-      const { username, password } = await request.json()
-      
-      if (!username || !password) {
-        return NextResponse.json({ error: 'Username and password required' }, { status: 400 })
+  const rejectAll = () => {
+    for (const result of results) {
+      if (result.status === 201) {
+        Object.assign(result, { status: 424, error: 'Not booked because another slot failed' })
       }
-      
-      const db = await connectDB()
-      const user = await db.collection('users').findOne({ username })
-      
-      if (!user || !await bcrypt.compare(password, user.password)) {
-        return NextResponse.json({ error: 'Invalid credentials' }, { status: 401 })
+    }
+    return respond()
+  }
+  
+  if (atomic && results.some((result) => result.status !== 201)) {
+    return rejectAll()
+  }
+  
+  // Claim the slots atomically, then insert everything that was claimed
+  const pending = results.filter((result) => result.status === 201).map((result) => result.reservation)
+  const claimed = await claimIntervals(db, pending)
+  for (const result of results) {
+    if (result.status === 201 && !claimed.has(result.reservation.id)) {
+      Object.assign(result, { status: 409, error: 'Time slot already reserved' })
+    }
+  }
+  
+  if (atomic && claimed.size < pending.length) {
+    await releaseIntervals(db, pending.filter((reservation) => claimed.has(reservation.id)))
+    return rejectAll()
+  }
+  
+  const reservations = pending.filter((reservation) => claimed.has(reservation.id))
+  if (reservations.length) {
+    try {
+      await db.collection('reservations').insertMany(reservations, { ordered: false })
+    } catch (error) {
+      const ids = reservations.map((reservation) => reservation.id)
+      if (atomic) {
+        // All or nothing: undo the rows that made it in
+        await db.collection('reservations').deleteMany({ id: { $in: ids } })
+        await releaseIntervals(db, reservations)
+        throw error
       }
-      
-      const token = jwt.sign({ userId: user.id }, JWT_SECRET, { expiresIn: '24h' })
-      
-      return NextResponse.json({
-        token,
-        user: {
-          id: user.id,
-          username: user.username,
-          role: user.role
-        }
-      })
+      const inserted = new Set(
+        (await db.collection('reservations').find({ id: { $in: ids } }, { projection: { id: 1 } }).toArray())
+          .map((reservation) => reservation.id)
+      )
+      await releaseIntervals(db, reservations.filter((reservation) => !inserted.has(reservation.id)))
+      await recordUsage(db, reservations.filter((reservation) => inserted.has(reservation.id)))
+      throw error
     }
-    
-    // Create reservation endpoint
-    if (path === 'reservations') {
-      return authMiddleware(async (request) => {
-        const { resourceId, date, startTime, duration } = await request.json()
-        
-        if (!resourceId || !date || !startTime || !duration) {
-          return NextResponse.json({ error: 'All fields are required' }, { status: 400 })
-        }
-        
-        const db = await connectDB()
-        
-        // Check if resource exists
-        const resource = await db.collection('resources').findOne({ id: resourceId })
-        if (!resource) {
-          return NextResponse.json({ error: 'Resource not found' }, { status: 404 })
-        }
-        
-        // Check for conflicts
-        const hasConflict = await checkReservationConflict(db, resourceId, date, startTime, parseFloat(duration))
-        if (hasConflict) {
-          return NextResponse.json({ error: 'Time slot already reserved' }, { status: 409 })
-        }
-        
-        // Create reservation
-        const reservation = {
-          id: uuidv4(),
-          userId: request.user.id,
-          resourceId,
-          date,
-          startTime,
-          duration,
-          createdAt: new Date()
-        }
-        
-        await db.collection('reservations').insertOne(reservation)
-        
-        return NextResponse.json(reservation, { status: 201 })
-      })(request, { params })
+    await recordUsage(db, reservations)
+    for (const reservation of reservations) {
+      publishReservationEvent('reservation.created', reservation)
     }
-    
-    // Create user endpoint (admin only)
-    if (path === 'users') {
-      return adminMiddleware(async (request) => {
-        const { username, password, role } = await request.json()
-        
-        if (!username || !password || !role) {
-          return NextResponse.json({ error: 'All fields are required' }, { status: 400 })
-        }
-        
-        if (!['user', 'admin'].includes(role)) {
-          return NextResponse.json({ error: 'Invalid role' }, { status: 400 })
-        }
-        
-        const db = await connectDB()
-        
-        // Check if user already exists
-        const existingUser = await db.collection('users').findOne({ username })
-        if (existingUser) {
-          return NextResponse.json({ error: 'Username already exists' }, { status: 409 })
-        }
-        
-        // Create user
-        const hashedPassword = await bcrypt.hash(password, 10)
-        const user = {
-          id: uuidv4(),
-          username,
-          password: hashedPassword,
-          role,
-          createdAt: new Date()
-        }
-        
-        await db.collection('users').insertOne(user)
-        
-        return NextResponse.json({
-          id: user.id,
-          username: user.username,
-          role: user.role
-        }, { status: 201 })
-      })(request, { params })
+  }
+  
+  return respond()
+}
+
+// Edit a reservation in place. PUT replaces resourceId, date, startTime and
+// duration; PATCH changes only the fields it is given.
+async function updateReservation(request, { params }) {
+  const body = await request.json()
+  const db = await connectDB()
+  
+  const existing = await db.collection('reservations').findOne({ id: params.id }, { projection: { _id: 0 } })
+  if (!existing) {
+    return NextResponse.json({ error: 'Reservation not found' }, { status: 404 })
+  }
+  
+  // Check if user owns the reservation or is admin
+  if (existing.userId !== request.user.id && request.user.role !== 'admin') {
+    return NextResponse.json({ error: 'Access denied' }, { status: 403 })
+  }
+  
+  const fields = request.method === 'PUT' ? body : { ...existing, ...body }
+  const { resourceId, date, startTime, duration } = fields
+  if (!resourceId) {
+    return NextResponse.json({ error: 'All fields are required' }, { status: 400 })
+  }
+  
+  const { start, end, error } = validateSlot({ date, startTime, duration })
+  if (error) {
+    return NextResponse.json({ error }, { status: 400 })
+  }
+  
+  const catalog = await getResourceCatalog(db)
+  if (!catalog.byId.has(resourceId)) {
+    return NextResponse.json({ error: 'Resource not found' }, { status: 404 })
+  }
+  
+  const changes = { resourceId, date, startTime, duration, start, end, updatedAt: new Date() }
+  const updated = { ...existing, ...changes }
+  const moved = resourceId !== existing.resourceId || start !== existing.start || end !== existing.end
+  
+  // Claim the new slot before releasing the old one, so the reservation
+  // never loses its place if the new slot is taken
+  if (moved) {
+    const hasConflict = await checkReservationConflict(db, resourceId, date, startTime, parseFloat(duration), params.id)
+    if (hasConflict || !await claimInterval(db, updated)) {
+      return NextResponse.json({ error: 'Time slot already reserved' }, { status: 409 })
     }
-    
-    return NextResponse.json({ error: 'Not found' }, { status: 404 })
-    
+  }
+  
+  // Only apply the edit if the reservation still holds the slot it was read
+  // with; a concurrent edit or delete makes this one lose
+  let matchedCount
+  try {
+    ({ matchedCount } = await db.collection('reservations').updateOne(
+      { id: params.id, resourceId: existing.resourceId, start: existing.start, end: existing.end },
+      { $set: changes }
+    ))
   } catch (error) {
-    console.error('POST Error:', error)
-    return NextResponse.json({ error: 'Internal server error' }, { status: 500 })
+    if (moved) await releaseIntervals(db, [updated])
+    throw error
   }
+  if (!matchedCount) {
+    const current = await db.collection('reservations').findOne({ id: params.id }, { projection: { _id: 0 } })
+    // A concurrent edit to the very same slot shares this claim; keep it
+    const sameSlot = current && current.resourceId === resourceId && current.start === start && current.end === end
+    if (moved && !sameSlot) await releaseIntervals(db, [updated])
+    if (!current) {
+      return NextResponse.json({ error: 'Reservation not found' }, { status: 404 })
+    }
+    return NextResponse.json({ error: 'Reservation was changed concurrently' }, { status: 409 })
+  }
+  if (moved) {
+    await releaseIntervals(db, [existing])
+    await recordUsage(db, [existing], -1)
+    await recordUsage(db, [updated])
+    promoteWaitlist(db, [existing])
+  }
+  publishReservationEvent('reservation.updated', updated)
+  
+  return NextResponse.json(updated)
 }
 
-export async function DELETE(request, { params }) {
-  await initializeDatabase()
+async function deleteReservation(request, { params }) {
+  const db = await connectDB()
   
-  const path = params.path?.join('/') || ''
+  // Find reservation
+  const reservation = await db.collection('reservations').findOne({ id: params.id })
+  if (!reservation) {
+    return NextResponse.json({ error: 'Reservation not found' }, { status: 404 })
+  }
+  
+  // Check if user owns the reservation or is admin
+  if (reservation.userId !== request.user.id && request.user.role !== 'admin') {
+    return NextResponse.json({ error: 'Access denied' }, { status: 403 })
+  }
+  
+  // Delete reservation and free its slot. The slot is taken from the
+  // document actually deleted: a concurrent edit may have moved it since the
+  // read above, and a concurrent delete or the archive job may have removed it.
+  const deleted = await db.collection('reservations').findOneAndDelete(
+    { id: params.id, userId: reservation.userId },
+    { projection: { _id: 0 } }
+  )
+  if (!deleted) {
+    return NextResponse.json({ error: 'Reservation not found' }, { status: 404 })
+  }
+  await releaseIntervals(db, [deleted])
+  await recordUsage(db, [deleted], -1)
+  publishReservationEvent('reservation.deleted', deleted)
+  promoteWaitlist(db, [deleted])
+  
+  return NextResponse.json({ message: 'Reservation deleted' })
+}
+
+// Waitlist endpoints (supercomputers)
+
+// Ask for `duration` hours of a supercomputer between `from` and `to`; the
+// scheduler books it as soon as a slot is free, by fair share between users.
+// Answers 201 when placed immediately, 202 when waiting.
+async function enqueue(request) {
+  const { resourceId, duration, from, to } = await request.json()
+  
+  if (!resourceId) {
+    return NextResponse.json({ error: 'resourceId, duration, from and to are required' }, { status: 400 })
+  }
+  
+  const window = validateQueueRequest({ duration, from, to })
+  if (window.error) {
+    return NextResponse.json({ error: window.error }, { status: 400 })
+  }
+  
+  const db = await connectDB()
+  const catalog = await getResourceCatalog(db)
+  const resource = catalog.byId.get(resourceId)
+  if (!resource) {
+    return NextResponse.json({ error: 'Resource not found' }, { status: 404 })
+  }
+  if (resource.type !== QUEUED_RESOURCE_TYPE) {
+    return NextResponse.json({ error: 'Only supercomputers have a waitlist' }, { status: 400 })
+  }
+  
+  const queued = await enqueueRequest(db, request.user, { resourceId, duration, ...window })
+  if (queued.error) {
+    return NextResponse.json({ error: queued.error }, { status: 429 })
+  }
+  
+  return NextResponse.json(queued, { status: queued.status === 'allocated' ? 201 : 202 })
+}
+
+// The user's waitlist requests, newest first
+async function listQueue(request, { url }) {
+  const db = await connectDB()
+  const requests = await db.collection('reservation_requests')
+    .find({ userId: request.user.id }, { projection: { _id: 0 } })
+    .sort({ createdAt: -1 })
+    .limit(parseLimit(url))
+    .toArray()
+  
+  return NextResponse.json(requests)
+}
+
+// Withdraw a waiting request
+async function cancelQueued(request, { params }) {
+  const db = await connectDB()
+  
+  const queued = await db.collection('reservation_requests').findOne({ id: params.id })
+  if (!queued) {
+    return NextResponse.json({ error: 'Request not found' }, { status: 404 })
+  }
+  
+  if (queued.userId !== request.user.id && request.user.role !== 'admin') {
+    return NextResponse.json({ error: 'Access denied' }, { status: 403 })
+  }
+  
+  const { modifiedCount } = await db.collection('reservation_requests').updateOne(
+    { id: params.id, status: 'waiting' },
+    { $set: { status: 'cancelled' } }
+  )
+  if (!modifiedCount) {
+    return NextResponse.json({ error: `Request is already ${queued.status}` }, { status: 409 })
+  }
+  
+  return NextResponse.json({ message: 'Request cancelled' })
+}
+
+// User endpoints (admin only)
+
+// Users, paged by username
+async function listUsers(request, { url }) {
+  const cursor = url.searchParams.get('cursor')
+  const after = cursor ? decodeCursor(cursor, 1) : null
+  if (cursor && !after) {
+    return NextResponse.json({ error: 'Invalid cursor' }, { status: 400 })
+  }
+  
+  const db = await connectDB()
+  const limit = parseLimit(url)
+  const users = await db.collection('users')
+    .find(after ? keysetFilter(['username'], after) : {}, { projection: { password: 0 } })
+    .sort({ username: 1 })
+    .limit(limit + 1)
+    .toArray()
+  
+  return pageResponse(paginate(users, ['username'], limit))
+}
+
+async function createUser(request) {
+  const { username, password, role } = await request.json()
+  
+  if (!username || !password || !role) {
+    return NextResponse.json({ error: 'All fields are required' }, { status: 400 })
+  }
+  
+  if (!['user', 'admin'].includes(role)) {
+    return NextResponse.json({ error: 'Invalid role' }, { status: 400 })
+  }
+  
+  const db = await connectDB()
   
+  // Check if user already exists
+  const existingUser = await db.collection('users').findOne({ username })
+  if (existingUser) {
+    return NextResponse.json({ error: 'Username already exists' }, { status: 409 })
+  }
+  
+  // Create user
+  let hashedPassword
   try {
-    // Delete reservation endpoint
-    if (path.startsWith('reservations/')) {
-      const reservationId = path.split('/')[1]
-      
-      return authMiddleware(async (request) => {
-        const db = await connectDB()
-        
-        // Find reservation
-        const reservation = await db.collection('reservations').findOne({ id: reservationId })
-        if (!reservation) {
-          return NextResponse.json({ error: 'Reservation not found' }, { status: 404 })
-        }
-        
-        // Check if user owns the reservation or is admin
-        if (reservation.userId !== request.user.id && request.user.role !== 'admin') {
-          return NextResponse.json({ error: 'Access denied' }, { status: 403 })
-        }
-        
-        // Delete reservation
-        await db.collection('reservations').deleteOne({ id: reservationId })
-        
-        return NextResponse.json({ message: 'Reservation deleted' })
-      })(request, { params })
-    }
-    
-    // Delete user endpoint (admin only)
-    if (path.startsWith('users/')) {
-      const userId = path.split('/')[1]
-      
-      return adminMiddleware(async (request) => {
-        const db = await connectDB()
-        
-        // Find user
-        const user = await db.collection('users').findOne({ id: userId })
-        if (!user) {
-          return NextResponse.json({ error: 'User not found' }, { status: 404 })
-        }
-        
-        // Prevent deleting admin user
-        if (user.username === 'admin') {
-          return NextResponse.json({ error: 'Cannot delete admin user' }, { status: 400 })
-        }
-        
-        // Delete user and their reservations
-        await db.collection('users').deleteOne({ id: userId })
-        await db.collection('reservations').deleteMany({ userId })
-        
-        return NextResponse.json({ message: 'User deleted' })
-      })(request, { params })
-    }
-    
-    return NextResponse.json({ error: 'Not found' }, { status: 404 })
-    
+    hashedPassword = await hashPassword(password)
+  } catch (error) {
+    if (error instanceof PasswordPoolBusyError) return serverBusy()
+    throw error
+  }
+  const user = {
+    id: uuidv4(),
+    username,
+    password: hashedPassword,
+    role,
+    createdAt: new Date()
+  }
+  
+  await db.collection('users').insertOne(user)
+  
+  return NextResponse.json({
+    id: user.id,
+    username: user.username,
+    role: user.role
+  }, { status: 201 })
+}
+
+async function deleteUser(request, { params }) {
+  const userId = params.id
+  const db = await connectDB()
+  
+  // Find user
+  const user = await db.collection('users').findOne({ id: userId })
+  if (!user) {
+    return NextResponse.json({ error: 'User not found' }, { status: 404 })
+  }
+  
+  // Prevent deleting admin user
+  if (user.username === 'admin') {
+    return NextResponse.json({ error: 'Cannot delete admin user' }, { status: 400 })
+  }
+  
+  // Delete user and their reservations, freeing their slots
+  const reservations = await db.collection('reservations')
+    .find({ userId }, { projection: { _id: 0 } })
+    .toArray()
+  // Archived reservations still count in the usage rollups; skip any the
+  // archive job moved after the read above
+  const hot = new Set(reservations.map((reservation) => reservation.id))
+  const archived = (await db.collection(ARCHIVE_COLLECTION)
+    .find({ userId }, { projection: { _id: 0, id: 1, userId: 1, resourceId: 1, start: 1, end: 1 } })
+    .toArray())
+    .filter((reservation) => !hot.has(reservation.id))
+  await db.collection('users').deleteOne({ id: userId })
+  await revokeUser(db, userId)
+  await db.collection('reservations').deleteMany({ userId })
+  await db.collection(ARCHIVE_COLLECTION).deleteMany({ userId })
+  await db.collection('reservation_requests').updateMany(
+    { userId, status: 'waiting' },
+    { $set: { status: 'cancelled' } }
+  )
+  await releaseIntervals(db, reservations)
+  await recordUsage(db, [...reservations, ...archived], -1)
+  for (const reservation of reservations) {
+    publishReservationEvent('reservation.deleted', reservation)
+  }
+  promoteWaitlist(db, reservations)
+  
+  return NextResponse.json({ message: 'User deleted' })
+}
+
+// Admin endpoints
+
+// Re-run database bootstrap (seed data and indexes) on demand
+async function reinitializeDatabase() {
+  let indexErrors
+  try {
+    ({ indexErrors } = await initializeDatabase({ force: true }))
   } catch (error) {
-    console.error('DELETE Error:', error)
-    return NextResponse.json({ error: 'Internal server error' }, { status: 500 })
+    return NextResponse.json({ error: `Database initialization failed: ${error.message}` }, { status: 500 })
+  }
+  if (indexErrors.length) {
+    return NextResponse.json({ error: 'Index creation failed', indexErrors }, { status: 500 })
+  }
+  return NextResponse.json({ message: 'Database initialized' })
+}
+
+// Utilization between `from` and `to` (YYYY-MM-DD, inclusive; default the
+// last 30 days), optionally for one resource, read from the usage rollups
+async function getAnalytics(request, { url }) {
+  const to = url.searchParams.get('to') || new Date().toISOString().slice(0, 10)
+  const from = url.searchParams.get('from') ||
+    new Date(Date.parse(`${to}T00:00:00Z`) - 29 * 86400000).toISOString().slice(0, 10)
+  const resourceId = url.searchParams.get('resourceId')
+
+  const span = (Date.parse(`${to}T00:00:00Z`) - Date.parse(`${from}T00:00:00Z`)) / 86400000
+  if (![from, to].every((date) => /^\d{4}-\d{2}-\d{2}$/.test(date)) || !(span >= 0)) {
+    return NextResponse.json({ error: 'from and to must be dates (YYYY-MM-DD), from before to' }, { status: 400 })
+  }
+  if (span >= MAX_ANALYTICS_DAYS) {
+    return NextResponse.json({ error: `Range cannot exceed ${MAX_ANALYTICS_DAYS} days` }, { status: 400 })
+  }
+
+  const db = await connectDB()
+  const catalog = await getResourceCatalog(db)
+  if (resourceId && !catalog.byId.has(resourceId)) {
+    return NextResponse.json({ error: 'Resource not found' }, { status: 404 })
+  }
+
+  const report = await usageReport(db, { from, to, resourceIds: resourceId ? [resourceId] : [...catalog.byId.keys()] })
+  const users = await db.collection('users')
+    .find({ id: { $in: report.users.map((user) => user.userId) } }, { projection: { _id: 0, id: 1, username: 1 } })
+    .toArray()
+  const usernames = new Map(users.map((user) => [user.id, user.username]))
+
+  return NextResponse.json({
+    from,
+    to,
+    resources: report.resources.map((usage) => {
+      const { name, type } = catalog.byId.get(usage.resourceId)
+      return { ...usage, name, type }
+    }),
+    days: report.days,
+    users: report.users.map((usage) => ({ ...usage, username: usernames.get(usage.userId) || null })),
+    heatmap: report.heatmap
+  })
+}
+
+// Archive reservations older than `olderThanDays` (default
+// ARCHIVE_AFTER_DAYS) now
+async function archiveNow(request) {
+  const body = await request.json().catch(() => ({}))
+  const olderThanDays = body.olderThanDays === undefined ? ARCHIVE_AFTER_DAYS : parseInt(body.olderThanDays, 10)
+  if (!Number.isInteger(olderThanDays) || olderThanDays < 1) {
+    return NextResponse.json({ error: 'olderThanDays must be a positive number of days' }, { status: 400 })
+  }
+
+  const db = await connectDB()
+  return NextResponse.json(await runArchiveJob(db, { olderThanDays }))
+}
+
+// Release ledger intervals left without a reservation, so their slots can
+// be booked again
+async function reconcileReservationLedger() {
+  const db = await connectDB()
+  return NextResponse.json(await reconcileLedger(db))
+}
+
+// Recompute the usage rollups from the reservations collection
+async function rebuildAnalytics() {
+  const db = await connectDB()
+  const documents = await rebuildUsage(db)
+  if (documents === null) {
+    return NextResponse.json({ error: 'A usage rebuild is already running' }, { status: 409 })
+  }
+  return NextResponse.json({ message: 'Usage rollups rebuilt', documents })
+}
+
+// In-process cache, password pool, login throttle, archive job and token
+// revocation statistics
+async function getStats() {
+  return NextResponse.json({
+    users: userCache.stats(),
+    resources: resourceCacheStats(),
+    passwords: passwordPoolStats(),
+    events: eventStats(),
+    loginThrottle: { ip: loginIpLimiter.stats(), failures: loginFailureLimiter.stats() },
+    archive: archiveStats(),
+    revocations: revocationStats()
+  })
+}
+
+const AUTH_WRAPPERS = {
+  public: (handler) => handler,
+  user: authMiddleware,
+  admin: adminMiddleware
+}
+
+// Route table, compiled once at module load. `auth` is public, user or
+// admin; routes bootstrap the database first unless `bootstrap` is false.
+const ROUTES = [
+  // Answered before bootstrapping so it reports an unreachable database
+  { method: 'GET', path: 'health', auth: 'public', bootstrap: false, handler: healthCheck },
+  { method: 'GET', path: 'metrics', auth: 'public', bootstrap: false, handler: getMetrics },
+  
+  { method: 'POST', path: 'auth/login', auth: 'public', handler: login },
+  { method: 'POST', path: 'auth/refresh', auth: 'public', handler: refresh },
+  { method: 'POST', path: 'auth/logout', auth: 'public', handler: logout },
+  { method: 'GET', path: 'auth/profile', auth: 'user', handler: getProfile },
+  
+  { method: 'GET', path: 'resources', auth: 'user', handler: listResources },
+  { method: 'GET', path: 'resources/availability', auth: 'user', handler: getAllAvailability },
+  { method: 'GET', path: 'resources/:id/availability', auth: 'user', handler: getResourceAvailability },
+  
+  { method: 'GET', path: 'events', auth: 'user', handler: streamEvents },
+  
+  { method: 'GET', path: 'reservations', auth: 'user', handler: listOwnReservations },
+  { method: 'POST', path: 'reservations', auth: 'user', handler: createReservation },
+  { method: 'POST', path: 'reservations/bulk', auth: 'user', handler: createReservationsBulk },
+  { method: 'PUT', path: 'reservations/:id', auth: 'user', handler: updateReservation },
+  { method: 'PATCH', path: 'reservations/:id', auth: 'user', handler: updateReservation },
+  { method: 'DELETE', path: 'reservations/:id', auth: 'user', handler: deleteReservation },
+  
+  { method: 'GET', path: 'queue', auth: 'user', handler: listQueue },
+  { method: 'POST', path: 'queue', auth: 'user', handler: enqueue },
+  { method: 'DELETE', path: 'queue/:id', auth: 'user', handler: cancelQueued },
+  
+  { method: 'GET', path: 'users', auth: 'admin', handler: listUsers },
+  { method: 'POST', path: 'users', auth: 'admin', handler: createUser },
+  { method: 'DELETE', path: 'users/:id', auth: 'admin', handler: deleteUser },
+  
+  { method: 'GET', path: 'admin/reservations', auth: 'admin', handler: listAllReservations },
+  { method: 'GET', path: 'admin/stats', auth: 'admin', handler: getStats },
+  { method: 'GET', path: 'admin/analytics', auth: 'admin', handler: getAnalytics },
+  { method: 'POST', path: 'admin/analytics/rebuild', auth: 'admin', handler: rebuildAnalytics },
+  { method: 'POST', path: 'admin/archive', auth: 'admin', handler: archiveNow },
+  { method: 'POST', path: 'admin/ledger/reconcile', auth: 'admin', handler: reconcileReservationLedger },
+  { method: 'POST', path: 'admin/initialize', auth: 'admin', handler: reinitializeDatabase }
+]
+
+const router = new Router(ROUTES.map(({ auth, bootstrap = true, handler, ...route }) => {
+  const authorized = AUTH_WRAPPERS[auth](handler)
+  return {
+    ...route,
+    auth,
+    handler: bootstrap
+      ? async (request, context) => {
+        await initializeDatabase()
+        return authorized(request, context)
+      }
+      : authorized
   }
-}
\ No newline at end of file
+}))
+router.onComplete(recordRequest)
+
+function handle(request, { params }) {
+  const path = params.path?.join('/') || ''
+  return measureRequest(() => router.dispatch(request, path, { url: new URL(request.url) }))
+}
+
+export async function GET(request, context) {
+  return handle(request, context)
+}
+
+export async function POST(request, context) {
+  return handle(request, context)
+}
+
+export async function PUT(request, context) {
+  return handle(request, context)
+}
+
+export async function PATCH(request, context) {
+  return handle(request, context)
+}
+
+export async function DELETE(request, context) {
+  return handle(request, context)
+}
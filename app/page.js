@@ -1,6 +1,6 @@
 'use client'
 
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { Button } from '@/components/ui/button'
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card'
 import { Input } from '@/components/ui/input'
@@ -12,14 +12,74 @@ import { Dialog, DialogContent, DialogDescription, DialogHeader, DialogTitle, Di
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs'
 import { Calendar, Clock, Users, Server, LogOut, Plus, Trash2, UserPlus } from 'lucide-react'
 
+// Insert or replace a reservation, keeping (date, startTime) order
+function upsertReservation(list, reservation) {
+  const rest = list.filter((item) => item.id !== reservation.id)
+  const key = (item) => `${item.date}T${item.startTime}`
+  const index = rest.findIndex((item) => key(item) > key(reservation))
+  return index === -1 ? [...rest, reservation] : [...rest.slice(0, index), reservation, ...rest.slice(index)]
+}
+
+function storeSession({ token, refreshToken }) {
+  localStorage.setItem('token', token)
+  localStorage.setItem('refreshToken', refreshToken)
+}
+
+function clearSession() {
+  localStorage.removeItem('token')
+  localStorage.removeItem('refreshToken')
+}
+
+let refreshing = null
+
+// Renew the short-lived access token with the refresh token; resolves false
+// once the session is over. Concurrent callers share one refresh.
+function renewSession() {
+  if (!refreshing) {
+    const refreshToken = localStorage.getItem('refreshToken')
+    refreshing = (async () => {
+      if (!refreshToken) return false
+      const response = await fetch('/api/auth/refresh', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ refreshToken })
+      })
+      if (response.ok) {
+        storeSession(await response.json())
+        return true
+      }
+      // Another tab may have used the same refresh token first
+      return localStorage.getItem('refreshToken') !== refreshToken
+    })().catch(() => false).finally(() => { refreshing = null })
+  }
+  return refreshing
+}
+
+// fetch with the stored access token, renewed once if it has expired
+async function authFetch(url, options = {}) {
+  const send = () => fetch(url, {
+    ...options,
+    headers: { ...options.headers, Authorization: `Bearer ${localStorage.getItem('token')}` }
+  })
+  const response = await send()
+  if (response.status === 401 && await renewSession()) {
+    return send()
+  }
+  return response
+}
+
 export default function CosmosIntranet() {
   const [user, setUser] = useState(null)
   const [resources, setResources] = useState([])
   const [reservations, setReservations] = useState([])
   const [users, setUsers] = useState([])
+  const [reservationsCursor, setReservationsCursor] = useState(null)
+  const [usersCursor, setUsersCursor] = useState(null)
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState('')
   const [success, setSuccess] = useState('')
+  // Supercomputer slot that was already taken, offered to the waitlist
+  const [waitlistSlot, setWaitlistSlot] = useState(null)
 
   // Login form state
   const [loginForm, setLoginForm] = useState({ username: '', password: '' })
@@ -29,9 +89,16 @@ export default function CosmosIntranet() {
     resourceId: '',
     date: '',
     startTime: '',
-    duration: '1'
+    duration: '1',
+    repeat: 'none',
+    occurrences: '4'
   })
 
+  // Free slots for the resource and date selected in the reservation form
+  const [freeSlots, setFreeSlots] = useState([])
+  // Current selection, read by the live update handler
+  const selectionRef = useRef({ resourceId: '', date: '' })
+
   // User management form state
   const [userForm, setUserForm] = useState({
     username: '',
@@ -40,9 +107,8 @@ export default function CosmosIntranet() {
   })
 
   useEffect(() => {
-    const token = localStorage.getItem('token')
-    if (token) {
-      fetchUserProfile(token)
+    if (localStorage.getItem('token')) {
+      fetchUserProfile()
     }
   }, [])
 
@@ -56,29 +122,40 @@ export default function CosmosIntranet() {
     }
   }, [user])
 
-  const fetchUserProfile = async (token) => {
+  useEffect(() => {
+    if (!user) return
+    const controller = new AbortController()
+    subscribeToEvents(controller.signal)
+    return () => controller.abort()
+  }, [user])
+
+  useEffect(() => {
+    selectionRef.current = { resourceId: reservationForm.resourceId, date: reservationForm.date }
+    if (reservationForm.resourceId && reservationForm.date) {
+      fetchAvailability(reservationForm.resourceId, reservationForm.date)
+    } else {
+      setFreeSlots([])
+    }
+  }, [reservationForm.resourceId, reservationForm.date])
+
+  const fetchUserProfile = async () => {
     try {
-      const response = await fetch('/api/auth/profile', {
-        headers: { Authorization: `Bearer ${token}` }
-      })
+      const response = await authFetch('/api/auth/profile')
       if (response.ok) {
         const userData = await response.json()
         setUser(userData)
       } else {
-        localStorage.removeItem('token')
+        clearSession()
       }
     } catch (error) {
       console.error('Profile fetch error:', error)
-      localStorage.removeItem('token')
+      clearSession()
     }
   }
 
   const fetchResources = async () => {
     try {
-      const token = localStorage.getItem('token')
-      const response = await fetch('/api/resources', {
-        headers: { Authorization: `Bearer ${token}` }
-      })
+      const response = await authFetch('/api/resources')
       if (response.ok) {
         const resourcesData = await response.json()
         setResources(resourcesData)
@@ -88,36 +165,106 @@ export default function CosmosIntranet() {
     }
   }
 
-  const fetchReservations = async () => {
+  // Upcoming reservations; pass the previous page's cursor to load more
+  const fetchReservations = async (cursor = null) => {
     try {
-      const token = localStorage.getItem('token')
-      const response = await fetch('/api/reservations', {
-        headers: { Authorization: `Bearer ${token}` }
-      })
+      const params = new URLSearchParams({ from: new Date().toISOString().split('T')[0] })
+      if (cursor) params.set('cursor', cursor)
+      const response = await authFetch(`/api/reservations?${params}`)
       if (response.ok) {
         const reservationsData = await response.json()
-        setReservations(reservationsData)
+        setReservations(cursor
+          ? (previous) => [...previous, ...reservationsData.filter((item) => !previous.some((known) => known.id === item.id))]
+          : reservationsData)
+        setReservationsCursor(response.headers.get('X-Next-Cursor'))
       }
     } catch (error) {
       console.error('Reservations fetch error:', error)
     }
   }
 
-  const fetchUsers = async () => {
+  const fetchAvailability = async (resourceId, date) => {
     try {
-      const token = localStorage.getItem('token')
-      const response = await fetch('/api/users', {
-        headers: { Authorization: `Bearer ${token}` }
-      })
+      const response = await authFetch(`/api/resources/${resourceId}/availability?from=${date}`)
+      if (response.ok) {
+        const availabilityData = await response.json()
+        setFreeSlots(availabilityData.free)
+      }
+    } catch (error) {
+      console.error('Availability fetch error:', error)
+    }
+  }
+
+  const fetchUsers = async (cursor = null) => {
+    try {
+      const response = await authFetch(cursor ? `/api/users?cursor=${cursor}` : '/api/users')
       if (response.ok) {
         const usersData = await response.json()
-        setUsers(usersData)
+        setUsers(cursor ? (previous) => [...previous, ...usersData] : usersData)
+        setUsersCursor(response.headers.get('X-Next-Cursor'))
       }
     } catch (error) {
       console.error('Users fetch error:', error)
     }
   }
 
+  // Apply a pushed reservation change to local state
+  const applyReservationEvent = (type, reservation) => {
+    if (reservation.mine) {
+      setReservations((previous) => type === 'reservation.deleted'
+        ? previous.filter((item) => item.id !== reservation.id)
+        : upsertReservation(previous, reservation))
+    }
+    // An edit may have freed a slot on another day, so refresh on any date
+    const { resourceId, date } = selectionRef.current
+    if (resourceId === reservation.resourceId && (date === reservation.date || type === 'reservation.updated')) {
+      fetchAvailability(resourceId, date)
+    }
+  }
+
+  // Follow the live update stream, reconnecting after a drop until aborted.
+  // Events are not replayed across connections, so every connect refetches
+  // the reservations and the selected availability to catch up.
+  const subscribeToEvents = async (signal) => {
+    while (!signal.aborted) {
+      try {
+        const response = await authFetch('/api/events', { signal })
+        if (response.status === 401) return
+        if (response.ok) {
+          const openedAt = Date.now()
+          fetchReservations()
+          const { resourceId, date } = selectionRef.current
+          if (resourceId && date) {
+            fetchAvailability(resourceId, date)
+          }
+          const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+          let buffer = ''
+          while (true) {
+            const { value, done } = await reader.read()
+            if (done) break
+            buffer += value
+            const messages = buffer.split('\n\n')
+            buffer = messages.pop()
+            for (const message of messages) {
+              const type = message.match(/^event: (.*)$/m)?.[1]
+              const data = message.match(/^data: (.*)$/m)?.[1]
+              if (type && data) {
+                applyReservationEvent(type, JSON.parse(data))
+              }
+            }
+          }
+          // Closed by the server, e.g. when the access token expired:
+          // reconnect right away unless it keeps closing at once
+          if (Date.now() - openedAt > 5000) continue
+        }
+      } catch (error) {
+        if (signal.aborted) return
+        console.error('Live updates error:', error)
+      }
+      await new Promise((resolve) => setTimeout(resolve, 5000))
+    }
+  }
+
   const handleLogin = async (e) => {
     e.preventDefault()
     setLoading(true)
@@ -133,7 +280,7 @@ export default function CosmosIntranet() {
       const data = await response.json()
 
       if (response.ok) {
-        localStorage.setItem('token', data.token)
+        storeSession(data)
         setUser(data.user)
         setSuccess('Login successful!')
         setLoginForm({ username: '', password: '' })
@@ -148,11 +295,21 @@ export default function CosmosIntranet() {
   }
 
   const handleLogout = () => {
-    localStorage.removeItem('token')
+    const refreshToken = localStorage.getItem('refreshToken')
+    if (refreshToken) {
+      fetch('/api/auth/logout', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ refreshToken })
+      }).catch(() => {})
+    }
+    clearSession()
     setUser(null)
     setResources([])
     setReservations([])
     setUsers([])
+    setReservationsCursor(null)
+    setUsersCursor(null)
   }
 
   const handleReservation = async (e) => {
@@ -160,26 +317,40 @@ export default function CosmosIntranet() {
     setLoading(true)
     setError('')
     setSuccess('')
+    setWaitlistSlot(null)
+
+    const { repeat, occurrences, ...slot } = reservationForm
 
     try {
-      const token = localStorage.getItem('token')
-      const response = await fetch('/api/reservations', {
+      const response = await authFetch(repeat === 'none' ? '/api/reservations' : '/api/reservations/bulk', {
         method: 'POST',
         headers: {
-          'Content-Type': 'application/json',
-          Authorization: `Bearer ${token}`
+          'Content-Type': 'application/json'
         },
-        body: JSON.stringify(reservationForm)
+        body: JSON.stringify(repeat === 'none' ? slot : {
+          resourceId: slot.resourceId,
+          recurrence: { ...slot, frequency: repeat, count: occurrences }
+        })
       })
 
       const data = await response.json()
+      const created = repeat === 'none' ? [data] : (data.results || []).filter((result) => result.reservation).map((result) => result.reservation)
 
       if (response.ok) {
-        setSuccess('Reservation created successfully!')
-        setReservationForm({ resourceId: '', date: '', startTime: '', duration: '1' })
-        fetchReservations()
+        setSuccess(repeat === 'none' || created.length === data.results.length
+          ? 'Reservation created successfully!'
+          : `Booked ${created.length} of ${data.results.length} occurrences; the others were already taken`)
+        setReservationForm({ resourceId: '', date: '', startTime: '', duration: '1', repeat: 'none', occurrences: '4' })
+        setReservations((previous) => created.reduce((list, reservation) => upsertReservation(list, {
+          ...reservation,
+          resource: resources.find((resource) => resource.id === reservation.resourceId)
+        }), previous))
       } else {
-        setError(data.error || 'Reservation failed')
+        setError(data.error || data.results?.find((result) => result.error)?.error || 'Reservation failed')
+        const resource = resources.find((item) => item.id === slot.resourceId)
+        if (response.status === 409 && repeat === 'none' && resource?.type === 'supercomputer') {
+          setWaitlistSlot(slot)
+        }
       }
     } catch (error) {
       setError('Network error. Please try again.')
@@ -188,6 +359,42 @@ export default function CosmosIntranet() {
     }
   }
 
+  // Queue the taken slot's duration for any time later that day instead of
+  // retrying; the server books it when a slot frees up
+  const handleJoinWaitlist = async () => {
+    const slot = waitlistSlot
+    setWaitlistSlot(null)
+    setError('')
+
+    try {
+      const response = await authFetch('/api/queue', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          resourceId: slot.resourceId,
+          duration: slot.duration,
+          from: `${slot.date}T${slot.startTime}`,
+          to: slot.date
+        })
+      })
+      const data = await response.json()
+
+      if (response.status === 201) {
+        setSuccess(`Booked ${data.reservation.date} at ${data.reservation.startTime} from the waitlist`)
+        setReservations((previous) => upsertReservation(previous, {
+          ...data.reservation,
+          resource: resources.find((resource) => resource.id === data.reservation.resourceId)
+        }))
+      } else if (response.ok) {
+        setSuccess('You are on the waitlist; the reservation will appear here once a slot frees up')
+      } else {
+        setError(data.error || 'Could not join the waitlist')
+      }
+    } catch (error) {
+      setError('Network error. Please try again.')
+    }
+  }
+
   const handleCreateUser = async (e) => {
     e.preventDefault()
     setLoading(true)
@@ -195,12 +402,10 @@ export default function CosmosIntranet() {
     setSuccess('')
 
     try {
-      const token = localStorage.getItem('token')
-      const response = await fetch('/api/users', {
+      const response = await authFetch('/api/users', {
         method: 'POST',
         headers: {
-          'Content-Type': 'application/json',
-          Authorization: `Bearer ${token}`
+          'Content-Type': 'application/json'
         },
         body: JSON.stringify(userForm)
       })
@@ -210,7 +415,7 @@ export default function CosmosIntranet() {
       if (response.ok) {
         setSuccess('User created successfully!')
         setUserForm({ username: '', password: '', role: 'user' })
-        fetchUsers()
+        setUsers((previous) => [...previous, data].sort((a, b) => a.username.localeCompare(b.username)))
       } else {
         setError(data.error || 'User creation failed')
       }
@@ -225,15 +430,13 @@ export default function CosmosIntranet() {
     if (!confirm('Are you sure you want to delete this reservation?')) return
 
     try {
-      const token = localStorage.getItem('token')
-      const response = await fetch(`/api/reservations/${reservationId}`, {
-        method: 'DELETE',
-        headers: { Authorization: `Bearer ${token}` }
+      const response = await authFetch(`/api/reservations/${reservationId}`, {
+        method: 'DELETE'
       })
 
       if (response.ok) {
         setSuccess('Reservation deleted successfully!')
-        fetchReservations()
+        setReservations((previous) => previous.filter((item) => item.id !== reservationId))
       } else {
         const data = await response.json()
         setError(data.error || 'Delete failed')
@@ -247,15 +450,13 @@ export default function CosmosIntranet() {
     if (!confirm('Are you sure you want to delete this user?')) return
 
     try {
-      const token = localStorage.getItem('token')
-      const response = await fetch(`/api/users/${userId}`, {
-        method: 'DELETE',
-        headers: { Authorization: `Bearer ${token}` }
+      const response = await authFetch(`/api/users/${userId}`, {
+        method: 'DELETE'
       })
 
       if (response.ok) {
         setSuccess('User deleted successfully!')
-        fetchUsers()
+        setUsers((previous) => previous.filter((item) => item.id !== userId))
       } else {
         const data = await response.json()
         setError(data.error || 'Delete failed')
@@ -361,7 +562,14 @@ export default function CosmosIntranet() {
       <main className="container mx-auto px-4 py-8">
         {error && (
           <Alert variant="destructive" className="mb-6">
-            <AlertDescription>{error}</AlertDescription>
+            <AlertDescription>
+              {error}
+              {waitlistSlot && (
+                <Button variant="outline" size="sm" className="ml-4" onClick={handleJoinWaitlist}>
+                  Join the waitlist for this day
+                </Button>
+              )}
+            </AlertDescription>
           </Alert>
         )}
         {success && (
@@ -450,6 +658,28 @@ export default function CosmosIntranet() {
                       />
                     </div>
 
+                    {reservationForm.resourceId && reservationForm.date && (
+                      <div>
+                        <Label>Free Slots</Label>
+                        <div className="flex flex-wrap gap-2 mt-1">
+                          {freeSlots.length === 0 ? (
+                            <p className="text-sm text-gray-500">No free time on this date</p>
+                          ) : (
+                            freeSlots.map((slot) => (
+                              <Badge
+                                key={slot.start}
+                                variant="outline"
+                                className="cursor-pointer border-[#dbb979] text-[#461044]"
+                                onClick={() => setReservationForm({ ...reservationForm, startTime: slot.start.split('T')[1] })}
+                              >
+                                {slot.start.split('T')[1]} - {slot.end.split('T')[1]}
+                              </Badge>
+                            ))
+                          )}
+                        </div>
+                      </div>
+                    )}
+
                     <div>
                       <Label htmlFor="startTime">Start Time</Label>
                       <Input
@@ -478,6 +708,39 @@ export default function CosmosIntranet() {
                       </Select>
                     </div>
 
+                    <div className="grid grid-cols-2 gap-4">
+                      <div>
+                        <Label htmlFor="repeat">Repeat</Label>
+                        <Select
+                          value={reservationForm.repeat}
+                          onValueChange={(value) => setReservationForm({ ...reservationForm, repeat: value })}
+                        >
+                          <SelectTrigger>
+                            <SelectValue />
+                          </SelectTrigger>
+                          <SelectContent>
+                            <SelectItem value="none">Does not repeat</SelectItem>
+                            <SelectItem value="daily">Daily</SelectItem>
+                            <SelectItem value="weekly">Weekly</SelectItem>
+                          </SelectContent>
+                        </Select>
+                      </div>
+                      {reservationForm.repeat !== 'none' && (
+                        <div>
+                          <Label htmlFor="occurrences">Occurrences</Label>
+                          <Input
+                            id="occurrences"
+                            type="number"
+                            min="2"
+                            max="100"
+                            value={reservationForm.occurrences}
+                            onChange={(e) => setReservationForm({ ...reservationForm, occurrences: e.target.value })}
+                            required
+                          />
+                        </div>
+                      )}
+                    </div>
+
                     <Button type="submit" className="w-full" disabled={loading}>
                       <Clock className="h-4 w-4 mr-2" />
                       {loading ? 'Booking...' : 'Make Reservation'}
@@ -526,6 +789,11 @@ export default function CosmosIntranet() {
                         </Button>
                       </div>
                     ))}
+                    {reservationsCursor && (
+                      <Button variant="outline" className="w-full" onClick={() => fetchReservations(reservationsCursor)}>
+                        Load more
+                      </Button>
+                    )}
                   </div>
                 )}
               </CardContent>
@@ -617,6 +885,11 @@ export default function CosmosIntranet() {
                           )}
                         </div>
                       ))}
+                      {usersCursor && (
+                        <Button variant="outline" className="w-full" onClick={() => fetchUsers(usersCursor)}>
+                          Load more
+                        </Button>
+                      )}
                     </div>
                   </CardContent>
                 </Card>
@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the Cosmos Intranet API
+Seeds MongoDB with a large dataset, times the main endpoints and compares
+the results against a saved JSON baseline
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import requests
+from pymongo import InsertOne, MongoClient, UpdateOne
+
+from backend_test import ADMIN_PASSWORD, ADMIN_USERNAME, BASE_URL, percentile
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+DB_NAME = os.environ.get("DB_NAME", "cosmos_intranet")
+
+# Seeded documents are tagged so they can be told apart and removed
+SEED_TAG = "benchmark"
+USER_PREFIX = "bench_"
+RESOURCE_PREFIX = "Bench "
+BENCH_PASSWORD = "benchmark"
+
+# The server's per-IP login limit, read from the same environment variable.
+# Every login this script makes counts against it, so the login benchmark
+# only uses what is left of the window.
+LOGIN_IP_LIMIT = int(os.environ.get("LOGIN_IP_LIMIT", "30"))
+logins_made = 0
+
+BATCH_SIZE = 5000
+MAX_BULK_SLOTS = 100
+DAY_START = 6 * 60
+DAY_END = 24 * 60
+
+
+def epoch_minutes(date, minute_of_day):
+    """Minutes since the epoch of a wall-clock time, read as UTC like the API does"""
+    midnight = datetime.strptime(date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    return int(midnight.timestamp()) // 60 + minute_of_day
+
+
+def format_hours(minutes):
+    """Duration field as the UI sends it: "0.5", "1", "2" """
+    hours = minutes / 60
+    return str(int(hours)) if hours == int(hours) else str(hours)
+
+
+class DatasetSeeder:
+    """Bulk-load realistic users, resources and a year of reservations"""
+
+    def __init__(self, db, users=500, resources=20, days=365, reservations=100000, seed=42):
+        self.db = db
+        self.user_count = users
+        self.resource_count = resources
+        self.days = days
+        self.target = reservations
+        self.random = random.Random(seed)
+
+    def password_hash(self):
+        """bcrypt hash of BENCH_PASSWORD, created through the API so no bcrypt
+        dependency is needed here"""
+        existing = self.db.users.find_one({"username": f"{USER_PREFIX}0"}, {"password": 1})
+        if existing:
+            return existing["password"]
+        token = admin_login()
+        response = requests.post(f"{BASE_URL}/users", headers={"Authorization": f"Bearer {token}"},
+                                 json={"username": f"{USER_PREFIX}0", "password": BENCH_PASSWORD, "role": "user"},
+                                 timeout=30)
+        response.raise_for_status()
+        self.db.users.update_one({"username": f"{USER_PREFIX}0"}, {"$set": {"seed": SEED_TAG}})
+        return self.db.users.find_one({"username": f"{USER_PREFIX}0"}, {"password": 1})["password"]
+
+    def seed_users(self):
+        password = self.password_hash()
+        now = datetime.now(timezone.utc)
+        operations = [
+            UpdateOne(
+                {"username": f"{USER_PREFIX}{i}"},
+                {"$setOnInsert": {"id": str(uuid.uuid4()), "password": password, "role": "user",
+                                  "createdAt": now, "seed": SEED_TAG}},
+                upsert=True)
+            for i in range(1, self.user_count)
+        ]
+        if operations:
+            self.db.users.bulk_write(operations, ordered=False)
+        return [user["id"] for user in self.db.users.find({"seed": SEED_TAG}, {"id": 1})]
+
+    def seed_resources(self):
+        now = datetime.now(timezone.utc)
+        operations = [
+            UpdateOne(
+                {"name": f"{RESOURCE_PREFIX}{i:03d}"},
+                {"$setOnInsert": {"id": str(uuid.uuid4()),
+                                  "type": "supercomputer" if i % 3 == 0 else "meeting_room",
+                                  "createdAt": now, "seed": SEED_TAG}},
+                upsert=True)
+            for i in range(self.resource_count)
+        ]
+        if operations:
+            self.db.resources.bulk_write(operations, ordered=False)
+            # Make every node reload its cached resource catalog
+            self.db.meta.update_one({"_id": "resources"}, {"$inc": {"version": 1}}, upsert=True)
+        return [resource["id"] for resource in self.db.resources.find({}, {"id": 1})]
+
+    def day_bookings(self, count):
+        """Up to `count` non-overlapping (start minute, length) pairs within one day"""
+        bookings = []
+        cursor = DAY_START
+        while len(bookings) < count:
+            cursor += self.random.choice([0, 0, 15, 30])
+            length = self.random.choice([30, 60, 60, 90, 120])
+            if cursor + length > DAY_END:
+                break
+            bookings.append((cursor, length))
+            cursor += length
+        return bookings
+
+    def generate(self, user_ids, resource_ids):
+        """Reservations and their ledger documents, half a year either side of today"""
+        first_day = datetime.now(timezone.utc).date() - timedelta(days=self.days // 2)
+        per_day = self.target / (len(resource_ids) * self.days)
+        # A few heavy users make the per-user listings realistic
+        heavy = user_ids[: max(1, len(user_ids) // 20)]
+        created_at = datetime.now(timezone.utc)
+
+        for offset in range(self.days):
+            date = (first_day + timedelta(days=offset)).isoformat()
+            for resource_id in resource_ids:
+                count = max(0, round(self.random.gauss(per_day, per_day / 3)))
+                intervals = []
+                for minute, length in self.day_bookings(count):
+                    user_id = self.random.choice(heavy if self.random.random() < 0.3 else user_ids)
+                    start = epoch_minutes(date, minute)
+                    reservation = {
+                        "id": str(uuid.uuid4()),
+                        "userId": user_id,
+                        "resourceId": resource_id,
+                        "date": date,
+                        "startTime": f"{minute // 60:02d}:{minute % 60:02d}",
+                        "duration": format_hours(length),
+                        "start": start,
+                        "end": start + length,
+                        "createdAt": created_at,
+                        "seed": SEED_TAG
+                    }
+                    intervals.append({"reservationId": reservation["id"], "start": start, "end": start + length})
+                    yield "reservation", reservation
+                if intervals:
+                    yield "ledger", (resource_id, date, intervals)
+
+    def seed_reservations(self, user_ids, resource_ids):
+        reservations, ledger = [], []
+        inserted = 0
+
+        def flush():
+            nonlocal inserted
+            if reservations:
+                self.db.reservations.bulk_write([InsertOne(doc) for doc in reservations], ordered=False)
+                inserted += len(reservations)
+                reservations.clear()
+            if ledger:
+                self.db.reservation_ledger.bulk_write(ledger, ordered=False)
+                ledger.clear()
+
+        for kind, item in self.generate(user_ids, resource_ids):
+            if kind == "reservation":
+                reservations.append(item)
+            else:
+                resource_id, date, intervals = item
+                ledger.append(UpdateOne({"resourceId": resource_id, "date": date},
+                                        {"$push": {"intervals": {"$each": intervals}}}, upsert=True))
+            if len(reservations) >= BATCH_SIZE:
+                flush()
+        flush()
+        return inserted
+
+    def run(self):
+        started = time.perf_counter()
+        print(f"🌱 Seeding {DB_NAME}: {self.user_count} users, {self.resource_count} extra resources, "
+              f"~{self.target} reservations over {self.days} days")
+        if self.db.reservations.find_one({"seed": SEED_TAG}):
+            sys.exit("The benchmark dataset is already seeded; run with --clean first")
+        user_ids = self.seed_users()
+        resource_ids = self.seed_resources()
+        inserted = self.seed_reservations(user_ids, resource_ids)
+        # Usage rollups are maintained by the API; rebuild them for the new data
+        token = admin_login()
+        requests.post(f"{BASE_URL}/admin/analytics/rebuild", headers={"Authorization": f"Bearer {token}"},
+                      timeout=600).raise_for_status()
+        print(f"✅ Inserted {inserted} reservations in {time.perf_counter() - started:.1f}s")
+
+
+def clean(db):
+    """Remove everything the seeder and the benchmarks created"""
+    ids = [r["id"] for r in db.reservations.find({"seed": SEED_TAG}, {"id": 1})]
+    for i in range(0, len(ids), BATCH_SIZE):
+        batch = ids[i:i + BATCH_SIZE]
+        db.reservation_ledger.update_many({"intervals.reservationId": {"$in": batch}},
+                                          {"$pull": {"intervals": {"reservationId": {"$in": batch}}}})
+    db.reservations.delete_many({"seed": SEED_TAG})
+    db.reservations_archive.delete_many({"seed": SEED_TAG})
+    resource_ids = [r["id"] for r in db.resources.find({"seed": SEED_TAG}, {"id": 1})]
+    db.reservation_ledger.delete_many({"resourceId": {"$in": resource_ids}})
+    db.resources.delete_many({"seed": SEED_TAG})
+    db.meta.update_one({"_id": "resources"}, {"$inc": {"version": 1}}, upsert=True)
+    db.users.delete_many({"seed": SEED_TAG})
+    token = admin_login()
+    requests.post(f"{BASE_URL}/admin/analytics/rebuild", headers={"Authorization": f"Bearer {token}"},
+                  timeout=600).raise_for_status()
+    print(f"🧹 Removed {len(ids)} seeded reservations and the seeded users and resources")
+
+
+def checked_login(response):
+    """Token from a login response; exits with a clear message when throttled"""
+    global logins_made
+    logins_made += 1
+    if response.status_code == 429:
+        sys.exit(f"Logins are throttled by the server (429, retry after {response.headers.get('Retry-After')}s). "
+                 f"Wait for the window to reset or raise LOGIN_IP_LIMIT on the server and here.")
+    response.raise_for_status()
+    return response.json()["token"]
+
+
+def admin_login():
+    return checked_login(requests.post(f"{BASE_URL}/auth/login",
+                                       json={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD}, timeout=30))
+
+
+class CosmosBenchmark:
+    """Sequential latency measurements of the main endpoints on the seeded dataset"""
+
+    def __init__(self, db, iterations=30, warmup=3):
+        self.db = db
+        self.iterations = iterations
+        self.warmup = warmup
+        self.session = requests.Session()
+        self.results = {}
+
+    def measure(self, name, request_fn, expected=(200,), iterations=None, warmup=None):
+        """Run request_fn warmup + iterations times; request_fn returns a response"""
+        iterations = self.iterations if iterations is None else iterations
+        warmup = self.warmup if warmup is None else warmup
+        latencies = []
+        statuses = {}
+        for i in range(warmup + iterations):
+            started = time.perf_counter()
+            response = request_fn()
+            elapsed = (time.perf_counter() - started) * 1000
+            if i >= warmup:
+                latencies.append(elapsed)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        self.record(name, latencies, statuses, expected)
+
+    def record(self, name, latencies, statuses, expected):
+        latencies.sort()
+        unexpected = sum(count for status, count in statuses.items() if status not in expected)
+        self.results[name] = {
+            "n": len(latencies),
+            "mean_ms": round(statistics.fmean(latencies), 2),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "max_ms": round(latencies[-1], 2),
+            "unexpected_status": unexpected
+        }
+        result = self.results[name]
+        flag = "⚠️ " if unexpected else ""
+        print(f"{flag}{name:<32} p50={result['p50_ms']:>8.1f}ms p95={result['p95_ms']:>8.1f}ms "
+              f"mean={result['mean_ms']:>8.1f}ms statuses={dict(sorted(statuses.items()))}")
+
+    def get(self, path, token, **kwargs):
+        return self.session.get(f"{BASE_URL}/{path}", headers={"Authorization": f"Bearer {token}"},
+                                timeout=60, **kwargs)
+
+    def login(self, username, password):
+        return checked_login(self.session.post(f"{BASE_URL}/auth/login",
+                                               json={"username": username, "password": password}, timeout=30))
+
+    def busiest_user(self):
+        """The seeded user with the most upcoming reservations"""
+        today = datetime.now(timezone.utc).date().isoformat()
+        top = list(self.db.reservations.aggregate([
+            {"$match": {"seed": SEED_TAG, "date": {"$gte": today}}},
+            {"$group": {"_id": "$userId", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1}},
+            {"$limit": 1}
+        ]))
+        if not top:
+            sys.exit("No seeded reservations found; run with --seed first")
+        return self.db.users.find_one({"id": top[0]["_id"]}, {"username": 1})["username"]
+
+    def run(self, cascade_size=500):
+        print(f"\n⏱️  Benchmarking {BASE_URL} ({self.iterations} iterations, {self.warmup} warm-up)")
+        admin_token = self.login(ADMIN_USERNAME, ADMIN_PASSWORD)
+        username = self.busiest_user()
+        user_token = self.login(username, BENCH_PASSWORD)
+        today = datetime.now(timezone.utc).date()
+        week = (today + timedelta(days=7)).isoformat()
+        today = today.isoformat()
+
+        self.measure("auth/profile", lambda: self.get("auth/profile", user_token))
+        self.measure("resources", lambda: self.get("resources", user_token))
+
+        self.measure("reservations (first page)", lambda: self.get(f"reservations?from={today}", user_token))
+        cursor = self.get(f"reservations?from={today}&limit=50", user_token).headers.get("X-Next-Cursor")
+        if cursor:
+            self.measure("reservations (next page)",
+                         lambda: self.get(f"reservations?from={today}&limit=50&cursor={cursor}", user_token))
+        self.measure("admin/reservations (one week)",
+                     lambda: self.get(f"admin/reservations?from={today}&to={week}", admin_token))
+        self.measure("users (first page)", lambda: self.get("users", admin_token))
+        self.measure("resources/availability (week)",
+                     lambda: self.get(f"resources/availability?from={today}&to={week}", user_token))
+        self.measure("admin/analytics (30 days)", lambda: self.get("admin/analytics", admin_token))
+
+        self.bench_conflict(user_token)
+        self.bench_user_deletion(admin_token, cascade_size)
+        self.bench_login(username)
+        return self.results
+
+    def bench_login(self, username):
+        """auth/login, run last with only the logins left under LOGIN_IP_LIMIT so
+        no measured attempt is throttled"""
+        budget = LOGIN_IP_LIMIT - logins_made
+        warmup = min(self.warmup, max(0, budget - 1))
+        iterations = min(self.iterations, budget - warmup)
+        if iterations < 1:
+            print(f"⚠️  Skipping auth/login: the run already made {logins_made} of {LOGIN_IP_LIMIT} logins allowed")
+            return
+        if iterations < self.iterations:
+            print(f"ℹ️  auth/login limited to {iterations} iterations by LOGIN_IP_LIMIT={LOGIN_IP_LIMIT}")
+        self.measure("auth/login", lambda: self.session.post(
+            f"{BASE_URL}/auth/login", json={"username": username, "password": BENCH_PASSWORD}, timeout=30),
+            iterations=iterations, warmup=warmup)
+
+    def bench_conflict(self, token):
+        """POST reservations onto a taken slot: validation plus the conflict check, answered 409"""
+        taken = self.db.reservations.find_one({"seed": SEED_TAG, "date": {"$gte": datetime.now(timezone.utc).date().isoformat()}})
+        slot = {key: taken[key] for key in ("resourceId", "date", "startTime", "duration")}
+        self.measure("reservations (conflict 409)", lambda: self.session.post(
+            f"{BASE_URL}/reservations", json=slot, headers={"Authorization": f"Bearer {token}"}, timeout=30),
+            expected=(409,))
+
+    def bench_user_deletion(self, admin_token, cascade_size):
+        """DELETE users/:id for a user holding `cascade_size` reservations. The
+        reservations are booked through the bulk endpoint so ledger and usage
+        rollups stay consistent."""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        resource_id = self.db.resources.find_one({"seed": SEED_TAG})["id"]
+        first_day = datetime.now(timezone.utc).date() + timedelta(days=3650)
+        latencies, statuses = [], {}
+
+        for run in range(max(3, self.iterations // 10)):
+            username = f"{USER_PREFIX}cascade_{uuid.uuid4().hex[:8]}"
+            response = self.session.post(f"{BASE_URL}/users", headers=headers, timeout=30, json={
+                "username": username, "password": BENCH_PASSWORD, "role": "user"})
+            response.raise_for_status()
+            user_id = response.json()["id"]
+            self.db.users.update_one({"id": user_id}, {"$set": {"seed": SEED_TAG}})
+            user_headers = {"Authorization": f"Bearer {self.login(username, BENCH_PASSWORD)}"}
+
+            for offset in range(0, cascade_size, MAX_BULK_SLOTS):
+                date = (first_day + timedelta(days=run * cascade_size + offset)).isoformat()
+                self.session.post(f"{BASE_URL}/reservations/bulk", headers=user_headers, timeout=120, json={
+                    "resourceId": resource_id,
+                    "recurrence": {"date": date, "startTime": "09:00", "duration": "1", "frequency": "daily",
+                                   "count": min(MAX_BULK_SLOTS, cascade_size - offset)}
+                }).raise_for_status()
+
+            started = time.perf_counter()
+            response = self.session.delete(f"{BASE_URL}/users/{user_id}", headers=headers, timeout=120)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        self.record(f"users/:id delete ({cascade_size} reservations)", latencies, statuses, (200,))
+
+
+def dataset_summary(db):
+    return {
+        "users": db.users.estimated_document_count(),
+        "resources": db.resources.estimated_document_count(),
+        "reservations": db.reservations.estimated_document_count(),
+        "archived": db.reservations_archive.estimated_document_count()
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance, floor_ms):
+    """Names of benchmarks whose p50 or p95 got slower than the baseline by more
+    than `tolerance` (a fraction) and `floor_ms` milliseconds"""
+    print(f"\n📊 Compared with baseline from {baseline.get('timestamp')} ({baseline.get('revision')})")
+    regressions = []
+    for name, result in results.items():
+        previous = baseline["results"].get(name)
+        if not previous:
+            print(f"   {name:<32} (new)")
+            continue
+        worse = []
+        for metric in ("p50_ms", "p95_ms"):
+            before, now = previous[metric], result[metric]
+            if now > before * (1 + tolerance) and now - before > floor_ms:
+                worse.append(f"{metric} {before:.1f} → {now:.1f}")
+        change = (result["p50_ms"] - previous["p50_ms"]) / previous["p50_ms"] * 100 if previous["p50_ms"] else 0
+        marker = "❌" if worse else "✅"
+        print(f"{marker} {name:<32} p50 {change:+6.1f}%  {'; '.join(worse)}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cosmos Intranet benchmark suite")
+    parser.add_argument("--seed", action="store_true", help="bulk-load the benchmark dataset before measuring")
+    parser.add_argument("--seed-only", action="store_true", help="seed and exit")
+    parser.add_argument("--clean", action="store_true", help="remove seeded data and exit")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--resources", type=int, default=20, help="resources added to the default ones")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--reservations", type=int, default=100000, help="approximate number of reservations")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--cascade-size", type=int, default=500, help="reservations held by each deleted user")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write this run's results")
+    parser.add_argument("--baseline", help="baseline JSON to compare against; exits 1 on regression")
+    parser.add_argument("--save-baseline", help="also write this run's results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown as a fraction")
+    parser.add_argument("--floor-ms", type=float, default=2.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    db = MongoClient(MONGO_URL)[DB_NAME]
+
+    if args.clean:
+        clean(db)
+        sys.exit(0)
+    if args.seed or args.seed_only:
+        DatasetSeeder(db, args.users, args.resources, args.days, args.reservations).run()
+        if args.seed_only:
+            sys.exit(0)
+
+    results = CosmosBenchmark(db, args.iterations, args.warmup).run(args.cascade_size)
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "base_url": BASE_URL,
+        "dataset": dataset_summary(db),
+        "iterations": args.iterations,
+        "results": results
+    }
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.floor_ms)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ No regressions")
@@ -4,9 +4,14 @@ Comprehensive Backend Testing for Cosmos Intranet System
 Tests authentication, user management, resources, and reservation system
 """
 
+import argparse
+import math
+import random
 import requests
 import json
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import os
 
@@ -250,6 +255,73 @@ class CosmosIntranetTester:
             except Exception as e:
                 self.log_result("Auth - Admin role control", False, f"Exception: {str(e)}")
 
+    def test_token_rotation(self):
+        """Test refresh token rotation, single use and logout"""
+        print("\n=== Testing Token Rotation ===")
+        
+        if not self.test_user_id:
+            self.log_result("Tokens - All tests", False, "Missing test user")
+            return
+
+        refresh = lambda token: requests.post(f"{BASE_URL}/auth/refresh", json={"refreshToken": token}, timeout=10)
+
+        try:
+            response = requests.post(f"{BASE_URL}/auth/login",
+                                   json={"username": "testuser_cosmos", "password": "testpass123"},
+                                   timeout=10)
+            first = response.json().get("refreshToken")
+            if response.status_code != 200 or not first:
+                self.log_result("Tokens - Login", False, f"Status: {response.status_code}, refresh token missing")
+                return
+        except Exception as e:
+            self.log_result("Tokens - Login", False, f"Exception: {str(e)}")
+            return
+
+        # Test 1: A refresh token is exchanged for a new pair
+        second = None
+        try:
+            response = refresh(first)
+            data = response.json()
+            
+            if response.status_code == 200 and data.get("token") and data.get("refreshToken") not in (None, first):
+                second = data["refreshToken"]
+                profile = requests.get(f"{BASE_URL}/auth/profile",
+                                     headers={"Authorization": f"Bearer {data['token']}"}, timeout=10)
+                self.log_result("Tokens - Refresh", profile.status_code == 200,
+                              f"New pair issued, profile with new access token: {profile.status_code}")
+            else:
+                self.log_result("Tokens - Refresh", False, f"Status: {response.status_code} - {response.text}")
+                
+        except Exception as e:
+            self.log_result("Tokens - Refresh", False, f"Exception: {str(e)}")
+
+        # Test 2: A used refresh token is rejected
+        try:
+            response = refresh(first)
+            
+            if response.status_code == 401:
+                self.log_result("Tokens - Single use", True, "Reused refresh token rejected")
+            else:
+                self.log_result("Tokens - Single use", False, f"Expected 401, got {response.status_code}")
+                
+        except Exception as e:
+            self.log_result("Tokens - Single use", False, f"Exception: {str(e)}")
+
+        # Test 3: Logout revokes the refresh token
+        if second:
+            try:
+                response = requests.post(f"{BASE_URL}/auth/logout", json={"refreshToken": second}, timeout=10)
+                reused = refresh(second)
+                
+                if response.status_code == 200 and reused.status_code == 401:
+                    self.log_result("Tokens - Logout", True, "Logged-out refresh token rejected")
+                else:
+                    self.log_result("Tokens - Logout", False,
+                                  f"Logout {response.status_code}, refresh after logout {reused.status_code}")
+                    
+            except Exception as e:
+                self.log_result("Tokens - Logout", False, f"Exception: {str(e)}")
+
     def test_reservation_system(self):
         """Test reservation system comprehensively"""
         print("\n=== Testing Reservation System ===")
@@ -403,6 +475,367 @@ class CosmosIntranetTester:
             except Exception as e:
                 self.log_result("Reservations - Admin delete", False, f"Exception: {str(e)}")
 
+    def test_reservation_update(self):
+        """Test moving reservations with PUT and PATCH"""
+        print("\n=== Testing Reservation Updates ===")
+        
+        if not self.user_token or not self.resources:
+            self.log_result("Reservation Update - All tests", False, "Missing user token or resources")
+            return
+
+        user_headers = {"Authorization": f"Bearer {self.user_token}"}
+        resource_id = self.resources[0]["id"]
+        day = (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%d")
+
+        try:
+            response = requests.post(f"{BASE_URL}/reservations",
+                                   json={"resourceId": resource_id, "date": day, "startTime": "09:00", "duration": "1"},
+                                   headers=user_headers, timeout=10)
+            blocker = requests.post(f"{BASE_URL}/reservations",
+                                  json={"resourceId": resource_id, "date": day, "startTime": "15:00", "duration": "1"},
+                                  headers=user_headers, timeout=10)
+            if response.status_code != 201 or blocker.status_code != 201:
+                self.log_result("Reservation Update - Setup", False,
+                              f"Status: {response.status_code}/{blocker.status_code}")
+                return
+            reservation_id = response.json()["id"]
+        except Exception as e:
+            self.log_result("Reservation Update - Setup", False, f"Exception: {str(e)}")
+            return
+
+        # Test 1: PATCH moves the reservation to a free slot
+        try:
+            response = requests.patch(f"{BASE_URL}/reservations/{reservation_id}",
+                                    json={"startTime": "11:00"}, headers=user_headers, timeout=10)
+            
+            if response.status_code == 200 and response.json().get("startTime") == "11:00":
+                self.log_result("Reservation Update - PATCH move", True, "Reservation moved to 11:00")
+            else:
+                self.log_result("Reservation Update - PATCH move", False,
+                              f"Status: {response.status_code} - {response.text}")
+                
+        except Exception as e:
+            self.log_result("Reservation Update - PATCH move", False, f"Exception: {str(e)}")
+
+        # Test 2: PUT onto a taken slot is refused and keeps the reservation
+        try:
+            response = requests.put(f"{BASE_URL}/reservations/{reservation_id}",
+                                  json={"resourceId": resource_id, "date": day, "startTime": "15:30", "duration": "1"},
+                                  headers=user_headers, timeout=10)
+            
+            if response.status_code == 409:
+                conflict = requests.post(f"{BASE_URL}/reservations",
+                                       json={"resourceId": resource_id, "date": day, "startTime": "11:00", "duration": "1"},
+                                       headers=user_headers, timeout=10)
+                if conflict.status_code == 409:
+                    self.log_result("Reservation Update - Taken slot", True,
+                                  "Move onto a taken slot rejected, original slot kept")
+                else:
+                    self.log_result("Reservation Update - Taken slot", False,
+                                  f"Original slot lost: booking it again returned {conflict.status_code}")
+            else:
+                self.log_result("Reservation Update - Taken slot", False,
+                              f"Expected 409, got {response.status_code}")
+                
+        except Exception as e:
+            self.log_result("Reservation Update - Taken slot", False, f"Exception: {str(e)}")
+
+        # Test 3: The slot left behind by a move can be booked again
+        try:
+            response = requests.post(f"{BASE_URL}/reservations",
+                                   json={"resourceId": resource_id, "date": day, "startTime": "09:00", "duration": "1"},
+                                   headers=user_headers, timeout=10)
+            
+            if response.status_code == 201:
+                self.log_result("Reservation Update - Old slot freed", True, "Previous slot booked again")
+            else:
+                self.log_result("Reservation Update - Old slot freed", False,
+                              f"Expected 201, got {response.status_code}")
+                
+        except Exception as e:
+            self.log_result("Reservation Update - Old slot freed", False, f"Exception: {str(e)}")
+
+        # Test 4: Unsupported method on a known route
+        try:
+            response = requests.post(f"{BASE_URL}/reservations/{reservation_id}",
+                                   json={}, headers=user_headers, timeout=10)
+            allowed = [method.strip() for method in response.headers.get("Allow", "").split(",")]
+            
+            if response.status_code == 405 and {"PUT", "PATCH", "DELETE"} <= set(allowed):
+                self.log_result("Reservation Update - 405 Allow", True, f"Allow: {', '.join(allowed)}")
+            else:
+                self.log_result("Reservation Update - 405 Allow", False,
+                              f"Expected 405 with Allow header, got {response.status_code} ({allowed})")
+                
+        except Exception as e:
+            self.log_result("Reservation Update - 405 Allow", False, f"Exception: {str(e)}")
+
+    def test_availability(self):
+        """Test the free intervals returned by the availability endpoints"""
+        print("\n=== Testing Availability ===")
+        
+        if not self.user_token or not self.resources:
+            self.log_result("Availability - All tests", False, "Missing user token or resources")
+            return
+
+        user_headers = {"Authorization": f"Bearer {self.user_token}"}
+        resource_id = self.resources[0]["id"]
+        eve = (datetime.now() + timedelta(days=10)).strftime("%Y-%m-%d")
+        day = (datetime.now() + timedelta(days=11)).strftime("%Y-%m-%d")
+        next_day = (datetime.now() + timedelta(days=12)).strftime("%Y-%m-%d")
+
+        # A booking spilling over from the previous day and one in the morning
+        booked = []
+        try:
+            for slot in [{"date": eve, "startTime": "22:00", "duration": "4"},
+                         {"date": day, "startTime": "10:00", "duration": "1.5"}]:
+                response = requests.post(f"{BASE_URL}/reservations", json={"resourceId": resource_id, **slot},
+                                       headers=user_headers, timeout=10)
+                if response.status_code != 201:
+                    self.log_result("Availability - Setup", False, f"Status: {response.status_code} - {response.text}")
+                    return
+                booked.append(response.json()["id"])
+        except Exception as e:
+            self.log_result("Availability - Setup", False, f"Exception: {str(e)}")
+            return
+
+        whole_day = [
+            {"start": f"{day}T02:00", "end": f"{day}T10:00", "hours": 8},
+            {"start": f"{day}T11:30", "end": f"{next_day}T00:00", "hours": 12.5}
+        ]
+
+        # Test 1: Without `to` the whole `from` day is searched
+        try:
+            response = requests.get(f"{BASE_URL}/resources/{resource_id}/availability",
+                                  params={"from": day}, headers=user_headers, timeout=10)
+            
+            if response.status_code == 200 and response.json().get("free") == whole_day:
+                self.log_result("Availability - Free intervals", True, "Gaps around both bookings returned")
+            else:
+                self.log_result("Availability - Free intervals", False,
+                              f"Status: {response.status_code} - {response.text}")
+                
+        except Exception as e:
+            self.log_result("Availability - Free intervals", False, f"Exception: {str(e)}")
+
+        # Test 2: An explicit `to` cuts the last interval
+        try:
+            response = requests.get(f"{BASE_URL}/resources/{resource_id}/availability",
+                                  params={"from": f"{day}T00:00", "to": f"{day}T12:00"},
+                                  headers=user_headers, timeout=10)
+            expected = [whole_day[0], {"start": f"{day}T11:30", "end": f"{day}T12:00", "hours": 0.5}]
+            
+            if response.status_code == 200 and response.json().get("free") == expected:
+                self.log_result("Availability - Explicit to", True, "Range ends at the requested time")
+            else:
+                self.log_result("Availability - Explicit to", False,
+                              f"Status: {response.status_code} - {response.text}")
+                
+        except Exception as e:
+            self.log_result("Availability - Explicit to", False, f"Exception: {str(e)}")
+
+        # Test 3: `duration` drops the intervals that are too short
+        try:
+            response = requests.get(f"{BASE_URL}/resources/{resource_id}/availability",
+                                  params={"from": day, "duration": "10"}, headers=user_headers, timeout=10)
+            
+            if response.status_code == 200 and response.json().get("free") == whole_day[1:]:
+                self.log_result("Availability - Duration filter", True, "Only the 12.5 h interval kept")
+            else:
+                self.log_result("Availability - Duration filter", False,
+                              f"Status: {response.status_code} - {response.text}")
+                
+        except Exception as e:
+            self.log_result("Availability - Duration filter", False, f"Exception: {str(e)}")
+
+        # Test 4: The batch endpoint agrees and lists every resource
+        try:
+            response = requests.get(f"{BASE_URL}/resources/availability",
+                                  params={"from": day}, headers=user_headers, timeout=10)
+            entries = response.json() if response.status_code == 200 else []
+            entry = next((e for e in entries if e["resourceId"] == resource_id), None)
+            
+            if len(entries) == len(self.resources) and entry and entry["free"] == whole_day:
+                self.log_result("Availability - Batch", True, f"{len(entries)} resources, same free intervals")
+            else:
+                self.log_result("Availability - Batch", False,
+                              f"Status: {response.status_code} - {response.text}")
+                
+        except Exception as e:
+            self.log_result("Availability - Batch", False, f"Exception: {str(e)}")
+
+        for reservation_id in booked:
+            requests.delete(f"{BASE_URL}/reservations/{reservation_id}", headers=user_headers, timeout=10)
+
+    def test_bulk_reservations(self):
+        """Test bulk booking of a recurrence, atomic and partial"""
+        print("\n=== Testing Bulk Reservations ===")
+        
+        if not self.user_token or len(self.resources) < 2:
+            self.log_result("Bulk Reservations - All tests", False, "Missing user token or resources")
+            return
+
+        user_headers = {"Authorization": f"Bearer {self.user_token}"}
+        resource_id = self.resources[1]["id"]
+        days = [(datetime.now() + timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(3, 7)]
+        recurrence = {"date": days[0], "startTime": "08:00", "duration": "1", "frequency": "daily", "count": 4}
+
+        # The third occurrence is already taken
+        try:
+            response = requests.post(f"{BASE_URL}/reservations",
+                                   json={"resourceId": resource_id, "date": days[2], "startTime": "08:30", "duration": "1"},
+                                   headers=user_headers, timeout=10)
+            if response.status_code != 201:
+                self.log_result("Bulk Reservations - Setup", False, f"Status: {response.status_code}")
+                return
+        except Exception as e:
+            self.log_result("Bulk Reservations - Setup", False, f"Exception: {str(e)}")
+            return
+
+        # Test 1: Atomic recurrence with one taken occurrence books nothing
+        try:
+            response = requests.post(f"{BASE_URL}/reservations/bulk",
+                                   json={"resourceId": resource_id, "recurrence": recurrence, "atomic": True},
+                                   headers=user_headers, timeout=10)
+            data = response.json()
+            statuses = [result["status"] for result in data.get("results", [])]
+            
+            if response.status_code == 409 and data.get("created") == 0 and statuses.count(409) == 1 \
+                    and statuses.count(424) == 3:
+                free = requests.post(f"{BASE_URL}/reservations",
+                                   json={"resourceId": resource_id, "date": days[0], "startTime": "08:00", "duration": "1"},
+                                   headers=user_headers, timeout=10)
+                if free.status_code == 201:
+                    requests.delete(f"{BASE_URL}/reservations/{free.json()['id']}", headers=user_headers, timeout=10)
+                    self.log_result("Bulk Reservations - Atomic", True, "Whole recurrence rejected, nothing booked")
+                else:
+                    self.log_result("Bulk Reservations - Atomic", False,
+                                  f"An occurrence stayed booked: booking it again returned {free.status_code}")
+            else:
+                self.log_result("Bulk Reservations - Atomic", False,
+                              f"Expected 409 with one 409 and three 424, got {response.status_code} {statuses}")
+                
+        except Exception as e:
+            self.log_result("Bulk Reservations - Atomic", False, f"Exception: {str(e)}")
+
+        # Test 2: Without atomic the free occurrences are booked
+        try:
+            response = requests.post(f"{BASE_URL}/reservations/bulk",
+                                   json={"resourceId": resource_id, "recurrence": recurrence},
+                                   headers=user_headers, timeout=10)
+            data = response.json()
+            statuses = [result["status"] for result in data.get("results", [])]
+            
+            if response.status_code == 207 and data.get("created") == 3 and statuses == [201, 201, 409, 201]:
+                self.log_result("Bulk Reservations - Partial", True, "3 occurrences booked, taken one reported 409")
+            else:
+                self.log_result("Bulk Reservations - Partial", False,
+                              f"Expected 207 with [201, 201, 409, 201], got {response.status_code} {statuses}")
+                
+        except Exception as e:
+            self.log_result("Bulk Reservations - Partial", False, f"Exception: {str(e)}")
+
+    def test_waitlist(self):
+        """Test the supercomputer waitlist: placement, waiting and promotion"""
+        print("\n=== Testing Waitlist ===")
+        
+        if not self.user_token or not self.resources:
+            self.log_result("Waitlist - All tests", False, "Missing user token or resources")
+            return
+
+        user_headers = {"Authorization": f"Bearer {self.user_token}"}
+        supercomputer = next((r for r in self.resources if r["type"] == "supercomputer"), None)
+        meeting_room = next((r for r in self.resources if r["type"] == "meeting_room"), None)
+        if not supercomputer or not meeting_room:
+            self.log_result("Waitlist - All tests", False, "Missing a supercomputer or a meeting room")
+            return
+
+        day = (datetime.now() + timedelta(days=8)).strftime("%Y-%m-%d")
+        window = {"resourceId": supercomputer["id"], "duration": "2", "from": f"{day}T08:00", "to": f"{day}T10:00"}
+
+        # Test 1: A free window is booked right away
+        blocking_id = None
+        try:
+            response = requests.post(f"{BASE_URL}/queue", json=window, headers=user_headers, timeout=10)
+            data = response.json()
+            
+            if response.status_code == 201 and data.get("status") == "allocated" and data.get("reservation"):
+                blocking_id = data["reservation"]["id"]
+                self.log_result("Waitlist - Free window", True,
+                              f"Placed at {data['reservation']['date']} {data['reservation']['startTime']}")
+            else:
+                self.log_result("Waitlist - Free window", False,
+                              f"Expected 201 with a reservation, got {response.status_code} - {response.text}")
+                
+        except Exception as e:
+            self.log_result("Waitlist - Free window", False, f"Exception: {str(e)}")
+
+        # Test 2: The same window, now full, waits
+        waiting_id = None
+        try:
+            response = requests.post(f"{BASE_URL}/queue", json=window, headers=user_headers, timeout=10)
+            data = response.json()
+            
+            if response.status_code == 202 and data.get("status") == "waiting":
+                waiting_id = data["id"]
+                self.log_result("Waitlist - Full window", True, "Request is waiting")
+            else:
+                self.log_result("Waitlist - Full window", False,
+                              f"Expected 202, got {response.status_code} - {response.text}")
+                
+        except Exception as e:
+            self.log_result("Waitlist - Full window", False, f"Exception: {str(e)}")
+
+        # Test 3: Freeing the slot allocates the waiting request
+        allocated = None
+        if blocking_id and waiting_id:
+            try:
+                response = requests.delete(f"{BASE_URL}/reservations/{blocking_id}", headers=user_headers, timeout=10)
+                # Promotion runs in the background after the delete answers
+                for _ in range(20):
+                    queue = requests.get(f"{BASE_URL}/queue", headers=user_headers, timeout=10).json()
+                    allocated = next((r for r in queue if r["id"] == waiting_id and r["status"] == "allocated"), None)
+                    if allocated:
+                        break
+                    time.sleep(0.25)
+                
+                if response.status_code == 200 and allocated:
+                    self.log_result("Waitlist - Promotion", True, "Waiting request allocated once the slot was freed")
+                else:
+                    self.log_result("Waitlist - Promotion", False,
+                                  f"Delete returned {response.status_code}, request not allocated")
+                    
+            except Exception as e:
+                self.log_result("Waitlist - Promotion", False, f"Exception: {str(e)}")
+
+        # Test 4: An allocated request can no longer be cancelled
+        if allocated:
+            try:
+                response = requests.delete(f"{BASE_URL}/queue/{waiting_id}", headers=user_headers, timeout=10)
+                
+                if response.status_code == 409:
+                    self.log_result("Waitlist - Cancel allocated", True, "Cancelling an allocated request rejected")
+                else:
+                    self.log_result("Waitlist - Cancel allocated", False,
+                                  f"Expected 409, got {response.status_code}")
+                    
+                requests.delete(f"{BASE_URL}/reservations/{allocated['reservationId']}", headers=user_headers, timeout=10)
+            except Exception as e:
+                self.log_result("Waitlist - Cancel allocated", False, f"Exception: {str(e)}")
+
+        # Test 5: Meeting rooms have no waitlist
+        try:
+            response = requests.post(f"{BASE_URL}/queue", json={**window, "resourceId": meeting_room["id"]},
+                                   headers=user_headers, timeout=10)
+            
+            if response.status_code == 400:
+                self.log_result("Waitlist - Meeting room", True, "Enqueue on a meeting room rejected")
+            else:
+                self.log_result("Waitlist - Meeting room", False, f"Expected 400, got {response.status_code}")
+                
+        except Exception as e:
+            self.log_result("Waitlist - Meeting room", False, f"Exception: {str(e)}")
+
     def test_user_deletion(self):
         """Test user deletion functionality"""
         print("\n=== Testing User Deletion ===")
@@ -435,12 +868,25 @@ class CosmosIntranetTester:
         except Exception as e:
             self.log_result("User Mgmt - Protect admin", False, f"Exception: {str(e)}")
 
+        # A session of the user, to check it is cut off by the deletion
+        refresh_token = None
+        try:
+            response = requests.post(f"{BASE_URL}/auth/login",
+                                   json={"username": "testuser_cosmos", "password": "testpass123"},
+                                   timeout=10)
+            if response.status_code == 200:
+                refresh_token = response.json().get("refreshToken")
+        except Exception as e:
+            self.log_result("User Mgmt - Revoke on delete", False, f"Exception: {str(e)}")
+
         # Test 2: Delete test user
+        deleted = False
         try:
             response = requests.delete(f"{BASE_URL}/users/{self.test_user_id}", 
                                      headers=headers, timeout=10)
             
             if response.status_code == 200:
+                deleted = True
                 self.log_result("User Mgmt - Delete user", True, "Successfully deleted test user")
             else:
                 self.log_result("User Mgmt - Delete user", False, f"Status: {response.status_code}")
@@ -448,6 +894,24 @@ class CosmosIntranetTester:
         except Exception as e:
             self.log_result("User Mgmt - Delete user", False, f"Exception: {str(e)}")
 
+        # Test 3: The deleted user's access and refresh tokens are rejected
+        if deleted and self.user_token:
+            try:
+                profile = requests.get(f"{BASE_URL}/auth/profile",
+                                     headers={"Authorization": f"Bearer {self.user_token}"}, timeout=10)
+                reused = requests.post(f"{BASE_URL}/auth/refresh", json={"refreshToken": refresh_token},
+                                     timeout=10) if refresh_token else None
+                
+                if profile.status_code == 401 and reused is not None and reused.status_code == 401:
+                    self.log_result("User Mgmt - Revoke on delete", True, "Deleted user's tokens rejected")
+                else:
+                    self.log_result("User Mgmt - Revoke on delete", False,
+                                  f"Access token {profile.status_code}, refresh token "
+                                  f"{reused.status_code if reused is not None else 'n/a'}")
+                    
+            except Exception as e:
+                self.log_result("User Mgmt - Revoke on delete", False, f"Exception: {str(e)}")
+
     def run_all_tests(self):
         """Run all tests in sequence"""
         print("🚀 Starting Cosmos Intranet Backend Testing")
@@ -458,7 +922,12 @@ class CosmosIntranetTester:
         self.test_authentication_system()
         self.test_resources_management()
         self.test_user_management()
+        self.test_token_rotation()
         self.test_reservation_system()
+        self.test_reservation_update()
+        self.test_availability()
+        self.test_bulk_reservations()
+        self.test_waitlist()
         self.test_user_deletion()
         
         # Print summary
@@ -476,6 +945,201 @@ class CosmosIntranetTester:
         
         return self.results
 
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class CosmosLoadTester:
+    """Concurrent load scenarios against the API, reporting latency and throughput"""
+
+    HISTOGRAM_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+    def __init__(self, concurrency=20, duration=10.0):
+        self.concurrency = concurrency
+        self.duration = duration
+        self.admin_token = None
+        self.resources = []
+        self.local = threading.local()
+        self.results = {
+            "passed": 0,
+            "failed": 0,
+            "errors": []
+        }
+
+    def log_result(self, test_name, success, message=""):
+        """Log test results"""
+        if success:
+            print(f"✅ {test_name}: PASSED {message}")
+            self.results["passed"] += 1
+        else:
+            print(f"❌ {test_name}: FAILED {message}")
+            self.results["failed"] += 1
+            self.results["errors"].append(f"{test_name}: {message}")
+
+    def session(self):
+        """One keep-alive session per worker thread"""
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def timed(self, method, path, **kwargs):
+        """Issue one request and return (status code, latency in ms)"""
+        started = time.perf_counter()
+        try:
+            response = self.session().request(method, f"{BASE_URL}/{path}", timeout=30, **kwargs)
+            status = response.status_code
+        except requests.RequestException:
+            status = 0
+        return status, (time.perf_counter() - started) * 1000
+
+    def setup(self):
+        """Log in as admin and load the resource list"""
+        response = requests.post(f"{BASE_URL}/auth/login",
+                                 json={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD},
+                                 timeout=10)
+        response.raise_for_status()
+        self.admin_token = response.json()["token"]
+        headers = {"Authorization": f"Bearer {self.admin_token}"}
+        self.resources = requests.get(f"{BASE_URL}/resources", headers=headers, timeout=10).json()
+
+    def run_for_duration(self, request_fn):
+        """Run request_fn from `concurrency` threads until the duration elapses"""
+        samples = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + self.duration
+
+        def worker():
+            local_samples = []
+            while time.perf_counter() < deadline:
+                local_samples.append(request_fn())
+            with lock:
+                samples.extend(local_samples)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for _ in range(self.concurrency):
+                executor.submit(worker)
+        return samples, time.perf_counter() - started
+
+    def report(self, name, samples, elapsed):
+        """Print status counts, requests/sec, percentiles and a latency histogram"""
+        latencies = sorted(latency for _, latency in samples)
+        statuses = {}
+        for status, _ in samples:
+            statuses[status] = statuses.get(status, 0) + 1
+
+        print(f"\n--- {name} ---")
+        print(f"Requests: {len(samples)} in {elapsed:.1f}s ({len(samples) / elapsed:.1f} req/s)")
+        print(f"Status codes: {dict(sorted(statuses.items()))}")
+        if not latencies:
+            return
+        print(f"Latency ms: p50={percentile(latencies, 50):.1f} p95={percentile(latencies, 95):.1f} "
+              f"p99={percentile(latencies, 99):.1f} max={latencies[-1]:.1f}")
+
+        counts = [0] * (len(self.HISTOGRAM_BUCKETS_MS) + 1)
+        for latency in latencies:
+            index = next((i for i, bound in enumerate(self.HISTOGRAM_BUCKETS_MS) if latency <= bound),
+                         len(self.HISTOGRAM_BUCKETS_MS))
+            counts[index] += 1
+        widest = max(counts)
+        for i, count in enumerate(counts):
+            label = f"<= {self.HISTOGRAM_BUCKETS_MS[i]}" if i < len(self.HISTOGRAM_BUCKETS_MS) else "> 5000"
+            print(f"  {label:>9} ms | {'#' * int(40 * count / widest):<40} {count}")
+
+    def scenario_login_storm(self):
+        """Concurrent logins; mostly bcrypt cost. Raise LOGIN_IP_LIMIT on the server
+        first, otherwise most requests are throttled with 429"""
+        samples, elapsed = self.run_for_duration(lambda: self.timed(
+            "POST", "auth/login", json={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD}))
+        self.report("Login storm", samples, elapsed)
+        ok = sum(1 for status, _ in samples if status == 200)
+        self.log_result("Load - Login storm", ok > 0, f"{ok}/{len(samples)} logins succeeded")
+
+    def scenario_listing_reads(self):
+        """Mixed authenticated reads: profile, resources, reservations"""
+        headers = {"Authorization": f"Bearer {self.admin_token}"}
+        paths = ["auth/profile", "resources", "reservations"]
+        samples, elapsed = self.run_for_duration(
+            lambda: self.timed("GET", random.choice(paths), headers=headers))
+        self.report("Listing-heavy reads", samples, elapsed)
+        ok = sum(1 for status, _ in samples if status in (200, 304))
+        self.log_result("Load - Listing reads", ok == len(samples), f"{ok}/{len(samples)} succeeded")
+
+    def scenario_booking_burst(self):
+        """All workers book the same slot at once; exactly one may succeed"""
+        headers = {"Authorization": f"Bearer {self.admin_token}"}
+        resource = next((r for r in self.resources if r["type"] == "supercomputer"), self.resources[0])
+        # A random far-future slot so reruns do not collide with earlier data
+        date = (datetime.now() + timedelta(days=random.randint(400, 4000))).strftime("%Y-%m-%d")
+        slot = {"resourceId": resource["id"], "date": date,
+                "startTime": f"{random.randint(0, 21):02d}:{random.choice(['00', '30'])}", "duration": "1"}
+        barrier = threading.Barrier(self.concurrency)
+        responses = []
+        lock = threading.Lock()
+
+        def book():
+            self.session()
+            barrier.wait()
+            started = time.perf_counter()
+            try:
+                response = self.session().post(f"{BASE_URL}/reservations", json=slot, headers=headers, timeout=30)
+            except requests.RequestException as e:
+                print(f"   Booking request failed: {e}")
+                return
+            with lock:
+                responses.append((response, (time.perf_counter() - started) * 1000))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for _ in range(self.concurrency):
+                executor.submit(book)
+        elapsed = time.perf_counter() - started
+
+        self.report(f"Booking burst ({resource['name']} {date} {slot['startTime']})",
+                    [(response.status_code, latency) for response, latency in responses], elapsed)
+        created = [response for response, _ in responses if response.status_code == 201]
+        conflicts = sum(1 for response, _ in responses if response.status_code == 409)
+        self.log_result("Load - Concurrent booking of one slot", len(created) == 1,
+                        f"{len(created)} created, {conflicts} conflicts out of {len(responses)}")
+
+        for response in created:
+            requests.delete(f"{BASE_URL}/reservations/{response.json()['id']}", headers=headers, timeout=10)
+
+    def run(self, scenarios):
+        """Run the selected scenarios"""
+        print("🚀 Starting Cosmos Intranet Load Testing")
+        print(f"Testing against: {BASE_URL} (concurrency {self.concurrency}, duration {self.duration}s)")
+        self.setup()
+
+        available = {
+            "login": self.scenario_login_storm,
+            "booking": self.scenario_booking_burst,
+            "listing": self.scenario_listing_reads
+        }
+        for name in scenarios:
+            available[name]()
+
+        print(f"\n{'='*50}")
+        print(f"✅ Passed: {self.results['passed']}")
+        print(f"❌ Failed: {self.results['failed']}")
+        return self.results
+
+
 if __name__ == "__main__":
-    tester = CosmosIntranetTester()
-    results = tester.run_all_tests()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Cosmos Intranet backend tests")
+    parser.add_argument("--load", action="store_true", help="run concurrent load scenarios instead of the functional tests")
+    parser.add_argument("--scenario", choices=["login", "booking", "listing", "all"], default="all")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per duration-based scenario")
+    args = parser.parse_args()
+
+    if args.load:
+        scenarios = ["booking", "listing", "login"] if args.scenario == "all" else [args.scenario]
+        results = CosmosLoadTester(args.concurrency, args.duration).run(scenarios)
+    else:
+        tester = CosmosIntranetTester()
+        results = tester.run_all_tests()
\ No newline at end of file
@@ -0,0 +1,238 @@
+import { ARCHIVE_COLLECTION, toDateString } from '@/lib/reservations'
+
+export const MAX_ANALYTICS_DAYS = 366
+
+const REBUILD_BATCH_SIZE = 1000
+
+export const USAGE_INDEXES = [
+  { key: { date: 1, resourceId: 1 }, name: 'date_resource_unique', unique: true }
+]
+
+// Booked minutes of one reservation per (date, hour of day). A booking
+// crossing midnight counts towards both days.
+function usageSlices({ start, end }) {
+  const slices = []
+  for (let hourStart = Math.floor(start / 60) * 60; hourStart < end; hourStart += 60) {
+    const minutes = Math.min(end, hourStart + 60) - Math.max(start, hourStart)
+    slices.push({ date: toDateString(hourStart), hour: (hourStart / 60) % 24, minutes })
+  }
+  return slices
+}
+
+// $inc of the usage_daily documents touched by `reservations`, keyed by
+// resourceId and date. Each document holds the booked minutes of one
+// resource on one day, overall, per hour of day and per user, and the
+// number of reservations starting that day.
+function usageIncrements(reservations, sign) {
+  const increments = new Map()
+  for (const reservation of reservations) {
+    if (!Number.isFinite(reservation.start)) continue
+    usageSlices(reservation).forEach(({ date, hour, minutes }, index) => {
+      const key = `${reservation.resourceId}|${date}`
+      if (!increments.has(key)) {
+        increments.set(key, { resourceId: reservation.resourceId, date, inc: {} })
+      }
+      const { inc } = increments.get(key)
+      const add = (field, value) => { inc[field] = (inc[field] || 0) + sign * value }
+      add('minutes', minutes)
+      add(`hours.${hour}`, minutes)
+      add(`users.${reservation.userId}`, minutes)
+      if (index === 0) {
+        add('reservations', 1)
+      }
+    })
+  }
+  return increments.values()
+}
+
+// Add (sign 1) or remove (sign -1) reservations from the usage rollups.
+// Called after the reservations themselves were written; a failure is logged
+// rather than failing the request, and rebuildUsage repairs any drift.
+export async function recordUsage(db, reservations, sign = 1) {
+  const operations = [...usageIncrements(reservations, sign)].map(({ resourceId, date, inc }) => ({
+    updateOne: { filter: { resourceId, date }, update: { $inc: inc }, upsert: true }
+  }))
+  if (!operations.length) return
+
+  try {
+    await db.collection('usage_daily').bulkWrite(operations, { ordered: false })
+  } catch (error) {
+    console.error('Usage rollup update failed:', error)
+  }
+}
+
+// Add the usage of every reservation read from `cursor` to `totals`.
+// Reservations already in `seen` are skipped: one moved to the archive
+// during a rebuild is read from both collections.
+async function accumulateUsage(cursor, totals, seen) {
+  for await (const reservation of cursor) {
+    if (seen.has(reservation.id)) continue
+    seen.add(reservation.id)
+    for (const { resourceId, date, inc } of usageIncrements([reservation], 1)) {
+      const key = `${resourceId}|${date}`
+      if (!totals.has(key)) {
+        totals.set(key, { resourceId, date, minutes: 0, reservations: 0, hours: {}, users: {} })
+      }
+      const document = totals.get(key)
+      for (const [field, value] of Object.entries(inc)) {
+        const [name, sub] = field.split('.')
+        if (sub === undefined) {
+          document[name] += value
+        } else {
+          document[name][sub] = (document[name][sub] || 0) + value
+        }
+      }
+    }
+  }
+}
+
+// Counters of a usage_daily document as dotted field paths
+function usageFields({ minutes = 0, reservations = 0, hours = {}, users = {} }) {
+  const fields = { minutes, reservations }
+  for (const [hour, value] of Object.entries(hours)) fields[`hours.${hour}`] = value
+  for (const [userId, value] of Object.entries(users)) fields[`users.${userId}`] = value
+  return fields
+}
+
+// A rebuild holds this lease in the meta document so only one runs at a time
+const REBUILD_LEASE_MS = 30 * 60 * 1000
+
+async function claimRebuild(db) {
+  const now = new Date()
+  try {
+    await db.collection('meta').updateOne(
+      { _id: 'usage', $or: [{ rebuildingUntil: { $exists: false } }, { rebuildingUntil: { $lte: now } }] },
+      { $set: { rebuildingUntil: new Date(now.getTime() + REBUILD_LEASE_MS) } },
+      { upsert: true }
+    )
+    return true
+  } catch (error) {
+    // The lease is held, so the filter missed and the upsert hit the _id
+    if (error.code === 11000) return false
+    throw error
+  }
+}
+
+// Recompute the usage_daily documents from the reservations and their
+// archive. The rollups are read first and then corrected with $inc by the
+// difference to the recomputed totals, so increments recorded by live
+// bookings while the rebuild runs are kept. Reservations created after the
+// rollups were read are left out of the totals, as their increments are
+// already counted. Returns the number of documents, or null when another
+// rebuild holds the lease.
+export async function rebuildUsage(db) {
+  if (!await claimRebuild(db)) {
+    return null
+  }
+
+  const meta = db.collection('meta')
+  try {
+    const usage = db.collection('usage_daily')
+    const startedAt = new Date()
+    const before = new Map()
+    for await (const document of usage.find({}, { projection: { _id: 0 } }).batchSize(REBUILD_BATCH_SIZE)) {
+      before.set(`${document.resourceId}|${document.date}`, document)
+    }
+
+    const totals = new Map()
+    const seen = new Set()
+    for (const collection of ['reservations', ARCHIVE_COLLECTION]) {
+      const cursor = db.collection(collection)
+        .find(
+          { start: { $exists: true }, createdAt: { $not: { $gte: startedAt } } },
+          { projection: { _id: 0, id: 1, resourceId: 1, userId: 1, start: 1, end: 1 } }
+        )
+        .batchSize(REBUILD_BATCH_SIZE)
+      await accumulateUsage(cursor, totals, seen)
+    }
+
+    const operations = []
+    for (const key of new Set([...totals.keys(), ...before.keys()])) {
+      const target = totals.has(key) ? usageFields(totals.get(key)) : {}
+      const current = before.has(key) ? usageFields(before.get(key)) : {}
+      const inc = {}
+      for (const field of new Set([...Object.keys(target), ...Object.keys(current)])) {
+        const delta = (target[field] || 0) - (current[field] || 0)
+        if (delta) inc[field] = delta
+      }
+      if (Object.keys(inc).length) {
+        const { resourceId, date } = totals.get(key) || before.get(key)
+        operations.push({ updateOne: { filter: { resourceId, date }, update: { $inc: inc }, upsert: true } })
+      }
+    }
+    for (let i = 0; i < operations.length; i += REBUILD_BATCH_SIZE) {
+      await usage.bulkWrite(operations.slice(i, i + REBUILD_BATCH_SIZE), { ordered: false })
+    }
+    await usage.deleteMany({ minutes: 0, reservations: 0 })
+
+    await meta.updateOne(
+      { _id: 'usage' },
+      { $set: { rebuiltAt: new Date(), documents: totals.size }, $unset: { rebuildingUntil: '' } }
+    )
+    return totals.size
+  } catch (error) {
+    await meta.updateOne({ _id: 'usage' }, { $unset: { rebuildingUntil: '' } }).catch(() => {})
+    throw error
+  }
+}
+
+// Build the rollups once for a database that predates them. When another
+// node holds the rebuild lease it is building them already; a rebuild that
+// starts just after another finished only finds nothing to correct.
+export async function ensureUsageRollups(db) {
+  if (await db.collection('meta').findOne({ _id: 'usage', rebuiltAt: { $exists: true } })) {
+    return
+  }
+  const documents = await rebuildUsage(db)
+  if (documents !== null) {
+    console.log(`Usage rollups built (${documents} documents)`)
+  }
+}
+
+// Utilization between two dates (inclusive) read from the rollups: booked
+// hours per resource, per day and per user, and a weekday x hour heatmap
+// (weekday 0 is Sunday) of booked hours. Reads at most one small document
+// per resource and day.
+export async function usageReport(db, { from, to, resourceIds }) {
+  const documents = await db.collection('usage_daily')
+    .find({ date: { $gte: from, $lte: to }, resourceId: { $in: resourceIds } }, { projection: { _id: 0 } })
+    .toArray()
+
+  const dayCount = (Date.parse(`${to}T00:00:00Z`) - Date.parse(`${from}T00:00:00Z`)) / 86400000 + 1
+  const resources = new Map(resourceIds.map((resourceId) => [resourceId, { minutes: 0, reservations: 0 }]))
+  const byDay = new Map()
+  const users = new Map()
+  const heatmap = Array.from({ length: 7 }, () => new Array(24).fill(0))
+
+  for (const document of documents) {
+    const resource = resources.get(document.resourceId)
+    resource.minutes += document.minutes
+    resource.reservations += document.reservations
+
+    byDay.set(document.date, (byDay.get(document.date) || 0) + document.minutes)
+
+    for (const [userId, minutes] of Object.entries(document.users || {})) {
+      users.set(userId, (users.get(userId) || 0) + minutes)
+    }
+
+    const weekday = new Date(`${document.date}T00:00:00Z`).getUTCDay()
+    for (const [hour, minutes] of Object.entries(document.hours || {})) {
+      heatmap[weekday][hour] += minutes / 60
+    }
+  }
+
+  return {
+    resources: [...resources].map(([resourceId, { minutes, reservations }]) => ({
+      resourceId,
+      hours: minutes / 60,
+      reservations,
+      utilization: minutes / (dayCount * 24 * 60)
+    })),
+    days: [...byDay].sort(([a], [b]) => a.localeCompare(b)).map(([date, minutes]) => ({ date, hours: minutes / 60 })),
+    users: [...users]
+      .filter(([, minutes]) => minutes > 0)
+      .sort(([, a], [, b]) => b - a)
+      .map(([userId, minutes]) => ({ userId, hours: minutes / 60 })),
+    heatmap
+  }
+}
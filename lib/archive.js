@@ -0,0 +1,93 @@
+import { ARCHIVE_COLLECTION, toDateString } from '@/lib/reservations'
+
+// Reservations dated more than this many days ago move to the archive;
+// 0 disables the scheduled job (POST /api/admin/archive still works)
+export const ARCHIVE_AFTER_DAYS = parseInt(process.env.ARCHIVE_AFTER_DAYS || '180', 10)
+const INTERVAL_MS = parseInt(process.env.ARCHIVE_INTERVAL_MS || String(6 * 60 * 60 * 1000), 10)
+const BATCH_SIZE = parseInt(process.env.ARCHIVE_BATCH_SIZE || '1000', 10)
+
+let timer = null
+let running = null
+const stats = { runs: 0, archived: 0, ledgerDeleted: 0, lastRunAt: null, lastError: null }
+
+// Move reservations dated before `olderThanDays` days ago from reservations
+// to the archive, BATCH_SIZE at a time: each batch is upserted into the
+// archive by id, then deleted from the hot collection, so a run interrupted
+// between the two steps (or racing another node) only repeats work. Ledger
+// days before the cutoff are dropped as well; past slots no longer need
+// guarding. Usage rollups keep counting archived reservations.
+export async function archiveReservations(db, { olderThanDays = ARCHIVE_AFTER_DAYS } = {}) {
+  const cutoff = toDateString(Math.floor(Date.now() / 60000) - olderThanDays * 24 * 60)
+  const reservations = db.collection('reservations')
+  const archive = db.collection(ARCHIVE_COLLECTION)
+  let archived = 0
+
+  for (;;) {
+    const batch = await reservations
+      .find({ date: { $lt: cutoff } }, { projection: { _id: 0 } })
+      .sort({ date: 1, startTime: 1, id: 1 })
+      .limit(BATCH_SIZE)
+      .toArray()
+    if (!batch.length) break
+
+    const archivedAt = new Date()
+    await archive.bulkWrite(
+      batch.map((reservation) => ({
+        replaceOne: { filter: { id: reservation.id }, replacement: { ...reservation, archivedAt }, upsert: true }
+      })),
+      { ordered: false }
+    )
+    const { deletedCount } = await reservations.deleteMany({ id: { $in: batch.map((reservation) => reservation.id) } })
+    archived += deletedCount
+    if (batch.length < BATCH_SIZE) break
+  }
+
+  const { deletedCount: ledgerDeleted } = await db.collection('reservation_ledger').deleteMany({ date: { $lt: cutoff } })
+
+  stats.runs++
+  stats.archived += archived
+  stats.ledgerDeleted += ledgerDeleted
+  stats.lastRunAt = new Date()
+  return { cutoff, archived, ledgerDeleted }
+}
+
+// Run the archive job now unless a run is already in progress in this process
+export function runArchiveJob(db, options) {
+  if (!running) {
+    running = archiveReservations(db, options)
+      .then((result) => {
+        stats.lastError = null
+        return result
+      })
+      .catch((error) => {
+        stats.lastError = error.message
+        throw error
+      })
+      .finally(() => { running = null })
+  }
+  return running
+}
+
+// Schedule the archive job every ARCHIVE_INTERVAL_MS, starting now
+export function startArchiveJob(db) {
+  if (timer || ARCHIVE_AFTER_DAYS <= 0) return
+
+  const run = () => runArchiveJob(db).then(
+    ({ archived }) => archived && console.log(`Archived ${archived} reservations`),
+    (error) => console.error('Reservation archive job failed:', error)
+  )
+  timer = setInterval(run, INTERVAL_MS)
+  timer.unref()
+  run()
+}
+
+export function archiveStats() {
+  return {
+    afterDays: ARCHIVE_AFTER_DAYS,
+    intervalMs: INTERVAL_MS,
+    batchSize: BATCH_SIZE,
+    scheduled: timer !== null,
+    running: running !== null,
+    ...stats
+  }
+}
@@ -0,0 +1,200 @@
+import { createHash, randomBytes } from 'crypto'
+import { EventEmitter } from 'events'
+import jwt from 'jsonwebtoken'
+import { LruCache } from '@/lib/cache'
+import { RateLimiter } from '@/lib/ratelimit'
+
+const JWT_SECRET = process.env.JWT_SECRET
+
+// Access tokens carry the user's id, name and role and are trusted without
+// a database lookup until they expire; refresh tokens are opaque, stored
+// hashed in refresh_tokens and rotated on every use
+export const ACCESS_TOKEN_TTL_SECONDS = parseInt(process.env.ACCESS_TOKEN_TTL_SECONDS || '900', 10)
+const REFRESH_TOKEN_TTL_SECONDS = parseInt(process.env.REFRESH_TOKEN_TTL_SECONDS || String(30 * 24 * 60 * 60), 10)
+
+// How often a node reads revocations made by other nodes
+const REVOCATION_SYNC_MS = parseInt(process.env.REVOCATION_SYNC_MS || '5000', 10)
+
+// Resolved { id, username, role } per userId, so authenticated requests skip
+// the users lookup. Entries expire after AUTH_CACHE_TTL_MS, which bounds how
+// long another process may serve a stale role.
+export const userCache = new LruCache({
+  max: parseInt(process.env.AUTH_CACHE_MAX || '1000', 10),
+  ttl: parseInt(process.env.AUTH_CACHE_TTL_MS || '60000', 10)
+})
+
+// Look up the user behind a token, from the cache when possible
+export async function resolveUser(db, userId) {
+  const cached = userCache.get(userId)
+  if (cached) {
+    return cached
+  }
+
+  const user = await db.collection('users').findOne(
+    { id: userId },
+    { projection: { _id: 0, id: 1, username: 1, role: 1 } }
+  )
+  if (!user) {
+    return null
+  }
+
+  const resolved = { id: user.id, username: user.username, role: user.role }
+  userCache.set(userId, resolved)
+  return resolved
+}
+
+// Drop a user's cached identity; call whenever a user is deleted or their
+// role changes
+export function invalidateUser(userId) {
+  userCache.delete(userId)
+}
+
+// Login attempts per client IP, successful or not
+export const loginIpLimiter = new RateLimiter({
+  limit: parseInt(process.env.LOGIN_IP_LIMIT || '30', 10),
+  windowMs: parseInt(process.env.LOGIN_IP_WINDOW_MS || '60000', 10)
+})
+
+// Failed logins per username and client IP; a successful login clears the
+// count
+export const loginFailureLimiter = new RateLimiter({
+  limit: parseInt(process.env.LOGIN_FAILURE_LIMIT || '10', 10),
+  windowMs: parseInt(process.env.LOGIN_FAILURE_WINDOW_MS || '900000', 10)
+})
+
+// userId -> time (ms) until which the user's access tokens are rejected
+const revoked = new Map()
+let revocationsSyncedAt = 0
+let revocationsSeen = new Date(0)
+
+// Emits 'revoked' with the userId whenever this node learns of a revocation
+const revocations = new EventEmitter()
+revocations.setMaxListeners(0)
+
+function markRevoked(userId, until) {
+  revoked.set(userId, until)
+  revocations.emit('revoked', userId)
+}
+
+// Call `listener(userId)` for every revocation made on this node or picked
+// up from other nodes; returns the unsubscribe function
+export function onUserRevoked(listener) {
+  revocations.on('revoked', listener)
+  return () => revocations.off('revoked', listener)
+}
+
+// Pick up revocations recorded by any node since the last sync. Runs at most
+// every REVOCATION_SYNC_MS, so token checks stay in memory.
+export async function syncRevocations(db) {
+  const now = Date.now()
+  if (now - revocationsSyncedAt < REVOCATION_SYNC_MS) return
+  revocationsSyncedAt = now
+
+  const recent = await db.collection('revocations')
+    .find({ createdAt: { $gte: revocationsSeen } }, { projection: { _id: 0, userId: 1, until: 1, createdAt: 1 } })
+    .toArray()
+  for (const { userId, until, createdAt } of recent) {
+    if (until.getTime() > now && revoked.get(userId) !== until.getTime()) {
+      markRevoked(userId, until.getTime())
+    }
+    if (createdAt > revocationsSeen) revocationsSeen = createdAt
+  }
+  for (const [userId, until] of revoked) {
+    if (until <= now) revoked.delete(userId)
+  }
+}
+
+function hashToken(token) {
+  return createHash('sha256').update(token).digest('base64url')
+}
+
+function signAccessToken(user) {
+  return jwt.sign(
+    { userId: user.id, username: user.username, role: user.role, type: 'access' },
+    JWT_SECRET,
+    { expiresIn: ACCESS_TOKEN_TTL_SECONDS }
+  )
+}
+
+// New access and refresh token pair for `user`, as returned by login and
+// refresh
+export async function issueSession(db, user) {
+  const refreshToken = randomBytes(32).toString('base64url')
+  const now = new Date()
+  await db.collection('refresh_tokens').insertOne({
+    hash: hashToken(refreshToken),
+    userId: user.id,
+    createdAt: now,
+    expiresAt: new Date(now.getTime() + REFRESH_TOKEN_TTL_SECONDS * 1000)
+  })
+  return {
+    token: signAccessToken(user),
+    refreshToken,
+    expiresIn: ACCESS_TOKEN_TTL_SECONDS,
+    user: { id: user.id, username: user.username, role: user.role }
+  }
+}
+
+// Exchange a refresh token for a new session. The token is consumed
+// atomically, so it can be used once; the role is re-read from users.
+// Returns null when the token is unknown, used or expired.
+export async function refreshSession(db, refreshToken) {
+  const stored = await db.collection('refresh_tokens').findOneAndDelete({
+    hash: hashToken(String(refreshToken)),
+    expiresAt: { $gt: new Date() }
+  })
+  if (!stored) {
+    return null
+  }
+
+  const user = await db.collection('users').findOne(
+    { id: stored.userId },
+    { projection: { _id: 0, id: 1, username: 1, role: 1 } }
+  )
+  return user ? issueSession(db, user) : null
+}
+
+// Forget a refresh token (logout)
+export async function revokeRefreshToken(db, refreshToken) {
+  await db.collection('refresh_tokens').deleteOne({ hash: hashToken(String(refreshToken)) })
+}
+
+// Cut a user off: their refresh tokens are deleted and access tokens already
+// issued are rejected by every node until they would have expired anyway
+export async function revokeUser(db, userId) {
+  const now = new Date()
+  const until = new Date(now.getTime() + ACCESS_TOKEN_TTL_SECONDS * 1000)
+  markRevoked(userId, until.getTime())
+  invalidateUser(userId)
+  await db.collection('revocations').updateOne(
+    { userId },
+    { $set: { until, createdAt: now } },
+    { upsert: true }
+  )
+  await db.collection('refresh_tokens').deleteMany({ userId })
+}
+
+// User { id, username, role, expiresAt } behind a bearer token, or null;
+// expiresAt is when the token expires, in ms. Access tokens are checked
+// against the in-memory revocation list only; tokens issued before access
+// tokens existed are still resolved through the users collection. Throws if
+// the token is malformed, forged or expired.
+export async function authenticate(db, token) {
+  const decoded = jwt.verify(token, JWT_SECRET)
+
+  await syncRevocations(db)
+  if (revoked.has(decoded.userId) && revoked.get(decoded.userId) > Date.now()) {
+    return null
+  }
+
+  const expiresAt = decoded.exp ? decoded.exp * 1000 : null
+  if (decoded.type === 'access') {
+    return { id: decoded.userId, username: decoded.username, role: decoded.role, expiresAt }
+  }
+  const user = await resolveUser(db, decoded.userId)
+  return user && { ...user, expiresAt }
+}
+
+export function revocationStats() {
+  return { revoked: revoked.size, syncIntervalMs: REVOCATION_SYNC_MS, accessTokenTtlSeconds: ACCESS_TOKEN_TTL_SECONDS }
+}
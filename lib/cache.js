@@ -0,0 +1,56 @@
+// Bounded in-process LRU cache with per-entry TTL and hit/miss counters.
+// A Map keeps insertion order, so re-inserting on read moves an entry to the
+// most-recently-used end and the first key is always the eviction candidate.
+export class LruCache {
+  constructor({ max = 1000, ttl = 60000 } = {}) {
+    this.max = max
+    this.ttl = ttl
+    this.entries = new Map()
+    this.hits = 0
+    this.misses = 0
+    this.evictions = 0
+  }
+
+  get(key) {
+    const entry = this.entries.get(key)
+    if (!entry || entry.expiresAt <= Date.now()) {
+      if (entry) this.entries.delete(key)
+      this.misses++
+      return undefined
+    }
+    this.entries.delete(key)
+    this.entries.set(key, entry)
+    this.hits++
+    return entry.value
+  }
+
+  set(key, value) {
+    this.entries.delete(key)
+    this.entries.set(key, { value, expiresAt: Date.now() + this.ttl })
+    while (this.entries.size > this.max) {
+      this.entries.delete(this.entries.keys().next().value)
+      this.evictions++
+    }
+  }
+
+  delete(key) {
+    return this.entries.delete(key)
+  }
+
+  clear() {
+    this.entries.clear()
+  }
+
+  stats() {
+    const lookups = this.hits + this.misses
+    return {
+      size: this.entries.size,
+      max: this.max,
+      ttl: this.ttl,
+      hits: this.hits,
+      misses: this.misses,
+      evictions: this.evictions,
+      hitRate: lookups ? this.hits / lookups : 0
+    }
+  }
+}
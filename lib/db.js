@@ -0,0 +1,218 @@
+import { MongoClient } from 'mongodb'
+import { v4 as uuidv4 } from 'uuid'
+import { ARCHIVE_COLLECTION, backfillReservationIntervals, reconcileLedger } from '@/lib/reservations'
+import { invalidateResources } from '@/lib/resources'
+import { hashPassword } from '@/lib/passwords'
+import { instrumentMongoClient } from '@/lib/metrics'
+import { USAGE_INDEXES, ensureUsageRollups } from '@/lib/analytics'
+import { startArchiveJob } from '@/lib/archive'
+
+function envInt(name, fallback) {
+  const value = parseInt(process.env[name], 10)
+  return Number.isFinite(value) ? value : fallback
+}
+
+// Pool sizing and timeouts; defaults match the driver's. Command monitoring
+// feeds the per-request database metrics.
+const client = new MongoClient(process.env.MONGO_URL, {
+  monitorCommands: true,
+  maxPoolSize: envInt('MONGO_MAX_POOL_SIZE', 100),
+  minPoolSize: envInt('MONGO_MIN_POOL_SIZE', 0),
+  maxIdleTimeMS: envInt('MONGO_MAX_IDLE_TIME_MS', 0),
+  waitQueueTimeoutMS: envInt('MONGO_WAIT_QUEUE_TIMEOUT_MS', 0),
+  connectTimeoutMS: envInt('MONGO_CONNECT_TIMEOUT_MS', 30000),
+  serverSelectionTimeoutMS: envInt('MONGO_SERVER_SELECTION_TIMEOUT_MS', 30000),
+  socketTimeoutMS: envInt('MONGO_SOCKET_TIMEOUT_MS', 0)
+})
+
+// Connection pool counters, maintained from the driver's pool events
+const pool = {
+  open: 0,
+  checkedOut: 0,
+  waitQueue: 0,
+  created: 0,
+  closed: 0,
+  checkOutFailed: 0,
+  cleared: 0
+}
+
+client.on('connectionCreated', () => { pool.open++; pool.created++ })
+client.on('connectionClosed', () => { pool.open--; pool.closed++ })
+client.on('connectionCheckOutStarted', () => { pool.waitQueue++ })
+client.on('connectionCheckedOut', () => { pool.waitQueue--; pool.checkedOut++ })
+client.on('connectionCheckOutFailed', () => { pool.waitQueue--; pool.checkOutFailed++ })
+client.on('connectionCheckedIn', () => { pool.checkedOut-- })
+client.on('connectionPoolCleared', () => { pool.cleared++ })
+
+instrumentMongoClient(client)
+
+const DEFAULT_RESOURCES = [
+  { name: 'Athéna', type: 'meeting_room' },
+  { name: 'Héra', type: 'meeting_room' },
+  { name: 'Hephaïstos', type: 'supercomputer' },
+  { name: 'Artémis', type: 'supercomputer' }
+]
+
+// Indexes the API relies on, keyed by collection
+const INDEXES = {
+  users: [
+    { key: { id: 1 }, name: 'id_unique', unique: true },
+    { key: { username: 1 }, name: 'username_unique', unique: true }
+  ],
+  resources: [
+    { key: { id: 1 }, name: 'id_unique', unique: true },
+    { key: { name: 1 }, name: 'name_unique', unique: true }
+  ],
+  reservations: [
+    { key: { id: 1 }, name: 'id_unique', unique: true },
+    { key: { userId: 1, date: 1, startTime: 1, id: 1 }, name: 'user_date_start_id' },
+    { key: { date: 1, startTime: 1, id: 1 }, name: 'date_start_id' },
+    { key: { resourceId: 1, date: 1, start: 1, end: 1 }, name: 'resource_date_interval' }
+  ],
+  [ARCHIVE_COLLECTION]: [
+    { key: { id: 1 }, name: 'id_unique', unique: true },
+    { key: { userId: 1, date: 1, startTime: 1, id: 1 }, name: 'user_date_start_id' },
+    { key: { date: 1, startTime: 1, id: 1 }, name: 'date_start_id' }
+  ],
+  reservation_ledger: [
+    { key: { resourceId: 1, date: 1 }, name: 'resource_date_unique', unique: true }
+  ],
+  refresh_tokens: [
+    { key: { hash: 1 }, name: 'hash_unique', unique: true },
+    { key: { userId: 1 }, name: 'user' },
+    { key: { expiresAt: 1 }, name: 'expires_ttl', expireAfterSeconds: 0 }
+  ],
+  revocations: [
+    { key: { userId: 1 }, name: 'user_unique', unique: true },
+    { key: { createdAt: 1 }, name: 'created' },
+    { key: { until: 1 }, name: 'until_ttl', expireAfterSeconds: 0 }
+  ],
+  reservation_requests: [
+    { key: { id: 1 }, name: 'id_unique', unique: true },
+    { key: { resourceId: 1, status: 1, createdAt: 1 }, name: 'resource_status_created' },
+    { key: { userId: 1, createdAt: -1 }, name: 'user_created' }
+  ],
+  usage_daily: USAGE_INDEXES
+}
+
+let connectPromise = null
+
+// Database connection. Every caller shares one connect promise, so
+// concurrent cold requests cannot race on client.connect(); once connected
+// the driver re-establishes dropped connections itself. A failed attempt is
+// forgotten so the next call retries.
+export function connectDB() {
+  if (!connectPromise) {
+    connectPromise = client.connect()
+      .then(() => client.db(process.env.DB_NAME))
+      .catch((error) => {
+        connectPromise = null
+        throw error
+      })
+  }
+  return connectPromise
+}
+
+export function poolStats() {
+  return { ...pool, maxPoolSize: client.options.maxPoolSize, minPoolSize: client.options.minPoolSize }
+}
+
+// Round-trip latency of a ping to the database
+export async function pingDB() {
+  const db = await connectDB()
+  const started = performance.now()
+  await db.command({ ping: 1 })
+  return performance.now() - started
+}
+
+// Create indexes; a failure is logged but does not block startup. Returns
+// the collections whose indexes failed, with the error message.
+async function ensureIndexes(db) {
+  const failures = []
+  for (const [collection, indexes] of Object.entries(INDEXES)) {
+    try {
+      await db.collection(collection).createIndexes(indexes)
+    } catch (error) {
+      console.error(`Index creation failed for ${collection}:`, error)
+      failures.push({ collection, error: error.message })
+    }
+  }
+  return failures
+}
+
+// Seed default admin and resources. Upserts keep this safe when several
+// processes bootstrap the same database at once.
+async function seedDatabase(db) {
+  const adminExists = await db.collection('users').findOne({ username: 'admin' })
+
+  if (!adminExists) {
+    const hashedPassword = await hashPassword('admin')
+    const result = await db.collection('users').updateOne(
+      { username: 'admin' },
+      {
+        $setOnInsert: {
+          id: uuidv4(),
+          username: 'admin',
+          password: hashedPassword,
+          role: 'admin',
+          createdAt: new Date()
+        }
+      },
+      { upsert: true }
+    )
+    if (result.upsertedCount) {
+      console.log('Default admin user created')
+    }
+  }
+
+  const resourceCount = await db.collection('resources').countDocuments()
+
+  if (resourceCount === 0) {
+    const result = await db.collection('resources').bulkWrite(
+      DEFAULT_RESOURCES.map((resource) => ({
+        updateOne: {
+          filter: { name: resource.name },
+          update: { $setOnInsert: { id: uuidv4(), ...resource, createdAt: new Date() } },
+          upsert: true
+        }
+      }))
+    )
+    if (result.upsertedCount) {
+      await invalidateResources(db)
+      console.log('Default resources created')
+    }
+  }
+}
+
+let initPromise = null
+
+// Bootstrap the database once per process. Concurrent callers share the same
+// promise, which never rejects; a failed run is logged and forgotten so the
+// next call retries. Pass { force: true } to re-run it on demand: the caller
+// then gets the run itself, which rejects on failure and resolves with
+// { indexErrors } listing the collections whose indexes could not be created.
+export function initializeDatabase({ force = false } = {}) {
+  if (!initPromise || force) {
+    const run = (async () => {
+      const db = await connectDB()
+      const indexErrors = await ensureIndexes(db)
+      await seedDatabase(db)
+      await backfillReservationIntervals(db)
+      await reconcileLedger(db)
+      await ensureUsageRollups(db)
+      startArchiveJob(db)
+      return { indexErrors }
+    })()
+    const promise = run.catch((error) => {
+      console.error('Database initialization error:', error)
+      if (initPromise === promise) {
+        initPromise = null
+      }
+    })
+    initPromise = promise
+    if (force) {
+      return run
+    }
+  }
+  return initPromise
+}
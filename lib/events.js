@@ -0,0 +1,181 @@
+import { EventEmitter } from 'events'
+import { onUserRevoked, syncRevocations } from '@/lib/auth'
+import { getResourceCatalog } from '@/lib/resources'
+
+// Where reservation events come from: 'local' publishes from this process's
+// handlers (single node); 'changestream' follows MongoDB change streams so
+// every node sees every change (requires a replica set)
+const SOURCE = process.env.EVENTS_SOURCE === 'changestream' ? 'changestream' : 'local'
+const MAX_SUBSCRIBERS = parseInt(process.env.EVENTS_MAX_SUBSCRIBERS || '1000', 10)
+const RESTART_DELAY_MS = 5000
+const HEARTBEAT_MS = 25000
+
+const bus = new EventEmitter()
+bus.setMaxListeners(0)
+
+const stats = { published: 0, delivered: 0, rejected: 0 }
+let changeStreamStarted = null
+
+// Reservation fields sent to clients
+function toPayload(reservation) {
+  const { _id, ...fields } = reservation
+  return fields
+}
+
+function emit(type, reservation) {
+  stats.published++
+  bus.emit('reservation', { type, reservation: toPayload(reservation) })
+}
+
+// Publish a reservation change from a request handler. In change stream mode
+// the change reaches subscribers through the stream instead.
+export function publishReservationEvent(type, reservation) {
+  if (SOURCE === 'local') {
+    emit(type, reservation)
+  }
+}
+
+// Register a listener for reservation events; returns the unsubscribe
+// function, or null when the subscriber limit is reached
+export function subscribe(listener) {
+  if (bus.listenerCount('reservation') >= MAX_SUBSCRIBERS) {
+    stats.rejected++
+    return null
+  }
+  const deliver = (event) => {
+    stats.delivered++
+    listener(event)
+  }
+  bus.on('reservation', deliver)
+  return () => bus.off('reservation', deliver)
+}
+
+// Start following the reservations change stream once per process. Updates
+// are looked up in full; deletes carry the removed document only when
+// pre-images are enabled, which is attempted on first start and otherwise
+// logged.
+export function startEventSource(db) {
+  if (SOURCE === 'changestream' && !changeStreamStarted) {
+    changeStreamStarted = enablePreImages(db).then(() => watchReservations(db))
+  }
+  return changeStreamStarted
+}
+
+async function enablePreImages(db) {
+  try {
+    await db.command({ collMod: 'reservations', changeStreamPreAndPostImages: { enabled: true } })
+  } catch (error) {
+    console.error('Could not enable change stream pre-images; deletions will not be pushed:', error)
+  }
+}
+
+function watchReservations(db, resumeAfter = undefined) {
+  const stream = db.collection('reservations').watch(
+    [{ $match: { operationType: { $in: ['insert', 'update', 'delete'] } } }],
+    { fullDocument: 'updateLookup', fullDocumentBeforeChange: 'whenAvailable', resumeAfter }
+  )
+
+  let lastToken = resumeAfter
+  stream.on('change', (change) => {
+    lastToken = change._id
+    if (change.operationType === 'insert') {
+      emit('reservation.created', change.fullDocument)
+    } else if (change.operationType === 'update') {
+      if (change.fullDocument) emit('reservation.updated', change.fullDocument)
+    } else if (change.fullDocumentBeforeChange) {
+      emit('reservation.deleted', change.fullDocumentBeforeChange)
+    }
+  })
+  stream.on('error', (error) => {
+    console.error('Reservation change stream error, restarting:', error)
+    stream.close().catch(() => {})
+    setTimeout(() => watchReservations(db, lastToken), RESTART_DELAY_MS)
+  })
+  return stream
+}
+
+// Server-Sent Events response streaming reservation deltas to `user`,
+// optionally limited to some resources. Each event carries the resource from
+// the catalog and a `mine` flag; only admins see other users' ids. Returns
+// null when the subscriber limit is reached. The stream is closed when the
+// user's token expires (user.expiresAt) or the user is revoked; the client
+// reconnects with a fresh token.
+export function createEventStream(db, user, { resourceIds = null, signal } = {}) {
+  const encoder = new TextEncoder()
+  let controller = null
+  let heartbeat = null
+  let expiry = null
+  let stopWatching = null
+
+  const send = (chunk) => {
+    try {
+      controller?.enqueue(encoder.encode(chunk))
+    } catch (error) {
+      close()
+    }
+  }
+
+  // Called by the EventEmitter without awaiting, so failures stop here
+  const unsubscribe = subscribe(async ({ type, reservation }) => {
+    if (resourceIds && !resourceIds.includes(reservation.resourceId)) return
+    try {
+      const catalog = await getResourceCatalog(db)
+      const { userId, ...fields } = reservation
+      const data = { ...fields, resource: catalog.byId.get(reservation.resourceId), mine: userId === user.id }
+      if (user.role === 'admin') data.userId = userId
+      send(`event: ${type}\ndata: ${JSON.stringify(data)}\n\n`)
+    } catch (error) {
+      console.error('Could not deliver reservation event:', error)
+    }
+  })
+  if (!unsubscribe) {
+    return null
+  }
+
+  stopWatching = onUserRevoked((userId) => {
+    if (userId === user.id) close()
+  })
+  if (user.expiresAt) {
+    expiry = setTimeout(close, Math.max(0, user.expiresAt - Date.now()))
+  }
+
+  function close() {
+    clearInterval(heartbeat)
+    clearTimeout(expiry)
+    stopWatching?.()
+    unsubscribe()
+    try {
+      controller?.close()
+    } catch (error) {
+      // already closed by the client
+    }
+    controller = null
+  }
+
+  const stream = new ReadableStream({
+    start(streamController) {
+      controller = streamController
+      send(`retry: ${RESTART_DELAY_MS}\n: connected\n\n`)
+      // The heartbeat also picks up revocations made on other nodes
+      heartbeat = setInterval(() => {
+        send(': ping\n\n')
+        syncRevocations(db).catch((error) => console.error('Revocation sync failed:', error))
+      }, HEARTBEAT_MS)
+    },
+    cancel: close
+  })
+  signal?.addEventListener('abort', close)
+
+  return new Response(stream, {
+    headers: {
+      'Content-Type': 'text/event-stream',
+      'Cache-Control': 'no-cache, no-transform',
+      Connection: 'keep-alive',
+      'X-Accel-Buffering': 'no'
+    }
+  })
+}
+
+export function eventStats() {
+  return { source: SOURCE, subscribers: bus.listenerCount('reservation'), maxSubscribers: MAX_SUBSCRIBERS, ...stats }
+}
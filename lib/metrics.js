@@ -0,0 +1,190 @@
+import { AsyncLocalStorage } from 'async_hooks'
+
+// Latency buckets in seconds, shared by request and database histograms
+const BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+// Requests slower than this many milliseconds are logged; unset disables it
+const SLOW_REQUEST_MS = parseFloat(process.env.METRICS_SLOW_REQUEST_MS || '')
+
+function escapeLabel(value) {
+  return String(value).replace(/\\/g, '\\\\').replace(/\n/g, '\\n').replace(/"/g, '\\"')
+}
+
+function formatLabels(labels) {
+  const pairs = Object.entries(labels).map(([name, value]) => `${name}="${escapeLabel(value)}"`)
+  return pairs.length ? `{${pairs.join(',')}}` : ''
+}
+
+function labelKey(labels) {
+  return JSON.stringify(Object.values(labels))
+}
+
+class Counter {
+  constructor(name, help) {
+    this.name = name
+    this.help = help
+    this.series = new Map()
+  }
+
+  inc(labels = {}, value = 1) {
+    const key = labelKey(labels)
+    const series = this.series.get(key)
+    if (series) {
+      series.value += value
+    } else {
+      this.series.set(key, { labels, value })
+    }
+  }
+
+  render() {
+    const lines = [`# HELP ${this.name} ${this.help}`, `# TYPE ${this.name} counter`]
+    for (const { labels, value } of this.series.values()) {
+      lines.push(`${this.name}${formatLabels(labels)} ${value}`)
+    }
+    return lines
+  }
+}
+
+class Histogram {
+  constructor(name, help, buckets = BUCKETS) {
+    this.name = name
+    this.help = help
+    this.buckets = buckets
+    this.series = new Map()
+  }
+
+  observe(labels, value) {
+    const key = labelKey(labels)
+    let series = this.series.get(key)
+    if (!series) {
+      series = { labels, counts: new Array(this.buckets.length).fill(0), sum: 0, count: 0 }
+      this.series.set(key, series)
+    }
+    const index = this.buckets.findIndex((bound) => value <= bound)
+    if (index !== -1) {
+      series.counts[index]++
+    }
+    series.sum += value
+    series.count++
+  }
+
+  render() {
+    const lines = [`# HELP ${this.name} ${this.help}`, `# TYPE ${this.name} histogram`]
+    for (const { labels, counts, sum, count } of this.series.values()) {
+      let cumulative = 0
+      this.buckets.forEach((bound, i) => {
+        cumulative += counts[i]
+        lines.push(`${this.name}_bucket${formatLabels({ ...labels, le: bound })} ${cumulative}`)
+      })
+      lines.push(`${this.name}_bucket${formatLabels({ ...labels, le: '+Inf' })} ${count}`)
+      lines.push(`${this.name}_sum${formatLabels(labels)} ${sum}`)
+      lines.push(`${this.name}_count${formatLabels(labels)} ${count}`)
+    }
+    return lines
+  }
+}
+
+function sampled(name, help, type, samples) {
+  const lines = [`# HELP ${name} ${help}`, `# TYPE ${name} ${type}`]
+  for (const [labels, value] of samples) {
+    lines.push(`${name}${formatLabels(labels)} ${Number(value) || 0}`)
+  }
+  return lines
+}
+
+const requestDuration = new Histogram('http_request_duration_seconds', 'API request latency by route')
+const requestsTotal = new Counter('http_requests_total', 'API requests by route and status code')
+const requestDbCalls = new Histogram(
+  'http_request_db_calls',
+  'MongoDB commands issued per API request',
+  [0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89]
+)
+const requestDbDuration = new Histogram('http_request_db_duration_seconds', 'Time spent in MongoDB per API request')
+const dbCommandDuration = new Histogram('mongodb_command_duration_seconds', 'MongoDB command latency')
+const dbCommandFailures = new Counter('mongodb_command_failures_total', 'Failed MongoDB commands')
+
+const requestContext = new AsyncLocalStorage()
+const pendingCommands = new Map()
+
+// Run `fn` as one API request, so database commands it issues are counted
+// against it
+export function measureRequest(fn) {
+  return requestContext.run({ dbCalls: 0, dbMs: 0, commands: [] }, fn)
+}
+
+// Router completion hook: record latency, status and database usage of the
+// request, and log it when slower than METRICS_SLOW_REQUEST_MS
+export function recordRequest({ method, route, status, durationMs }) {
+  const store = requestContext.getStore()
+  const labels = { method, route: route || 'unmatched' }
+
+  requestDuration.observe(labels, durationMs / 1000)
+  requestsTotal.inc({ ...labels, status })
+  if (store) {
+    requestDbCalls.observe(labels, store.dbCalls)
+    requestDbDuration.observe(labels, store.dbMs / 1000)
+  }
+
+  if (durationMs >= SLOW_REQUEST_MS) {
+    const commands = store?.commands.map(({ operation, ms }) => `${operation} ${ms.toFixed(1)}ms`).join(', ')
+    console.warn(
+      `Slow request: ${method} ${labels.route} ${status} in ${durationMs.toFixed(1)}ms` +
+      (store ? `, ${store.dbCalls} db calls in ${store.dbMs.toFixed(1)}ms [${commands}]` : '')
+    )
+  }
+}
+
+// Feed command monitoring events of a MongoClient created with
+// monitorCommands: true into the database metrics. Queries may name their
+// caller with the `comment` option, which becomes the `operation` label.
+export function instrumentMongoClient(client) {
+  client.on('commandStarted', (event) => {
+    const target = event.command[event.commandName]
+    pendingCommands.set(event.requestId, {
+      command: event.commandName,
+      collection: typeof target === 'string' ? target : '',
+      operation: typeof event.command.comment === 'string' ? event.command.comment : '',
+      store: requestContext.getStore()
+    })
+  })
+
+  const finish = (event, failed) => {
+    const pending = pendingCommands.get(event.requestId)
+    if (!pending) return
+    pendingCommands.delete(event.requestId)
+
+    const { store, ...labels } = pending
+    dbCommandDuration.observe(labels, event.duration / 1000)
+    if (failed) {
+      dbCommandFailures.inc(labels)
+    }
+    if (store) {
+      store.dbCalls++
+      store.dbMs += event.duration
+      if (SLOW_REQUEST_MS >= 0) {
+        const name = labels.operation || `${labels.command} ${labels.collection}`.trim()
+        store.commands.push({ operation: name, ms: event.duration })
+      }
+    }
+  }
+  client.on('commandSucceeded', (event) => finish(event, false))
+  client.on('commandFailed', (event) => finish(event, true))
+}
+
+// Prometheus text exposition of the request and database metrics, plus the
+// values read from other modules in `snapshot`:
+// { name: { help, type: 'gauge' | 'counter', samples: [[labels, value], ...] } }
+export function renderMetrics(snapshot = {}) {
+  const lines = [
+    ...requestDuration.render(),
+    ...requestsTotal.render(),
+    ...requestDbCalls.render(),
+    ...requestDbDuration.render(),
+    ...dbCommandDuration.render(),
+    ...dbCommandFailures.render()
+  ]
+  for (const [name, { help, type = 'gauge', samples }] of Object.entries(snapshot)) {
+    lines.push(...sampled(name, help, type, samples))
+  }
+  return lines.join('\n') + '\n'
+}
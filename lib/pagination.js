@@ -0,0 +1,48 @@
+export const DEFAULT_PAGE_SIZE = 100
+export const MAX_PAGE_SIZE = 500
+
+// Opaque cursor holding the sort-key values of the last row of a page
+export function encodeCursor(values) {
+  return Buffer.from(JSON.stringify(values)).toString('base64url')
+}
+
+export function decodeCursor(cursor, length) {
+  try {
+    const values = JSON.parse(Buffer.from(cursor, 'base64url').toString())
+    return Array.isArray(values) && values.length === length ? values : null
+  } catch (error) {
+    return null
+  }
+}
+
+// Page size from the `limit` query parameter, clamped to MAX_PAGE_SIZE
+export function parseLimit(url) {
+  const limit = parseInt(url.searchParams.get('limit') || DEFAULT_PAGE_SIZE, 10)
+  return Number.isFinite(limit) && limit > 0 ? Math.min(limit, MAX_PAGE_SIZE) : DEFAULT_PAGE_SIZE
+}
+
+// Filter matching rows strictly after `values` in ascending order of
+// `fields`, e.g. (a > x) or (a = x and b > y) or (a = x and b = y and c > z)
+export function keysetFilter(fields, values) {
+  return {
+    $or: fields.map((field, i) => {
+      const clause = {}
+      for (let j = 0; j < i; j++) {
+        clause[fields[j]] = values[j]
+      }
+      clause[field] = { $gt: values[i] }
+      return clause
+    })
+  }
+}
+
+// Read one page of `limit` rows (fetched as limit + 1 to detect more) and
+// return it with the cursor of the next page, or null on the last one
+export function paginate(rows, fields, limit) {
+  if (rows.length <= limit) {
+    return { items: rows, nextCursor: null }
+  }
+  const items = rows.slice(0, limit)
+  const last = items[items.length - 1]
+  return { items, nextCursor: encodeCursor(fields.map((field) => last[field])) }
+}
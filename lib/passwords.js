@@ -0,0 +1,162 @@
+import { Worker } from 'worker_threads'
+import { cpus } from 'os'
+import bcrypt from 'bcryptjs'
+
+export const BCRYPT_ROUNDS = 10
+
+const POOL_SIZE = parseInt(process.env.PASSWORD_WORKERS || String(Math.min(4, Math.max(1, cpus().length - 1))), 10)
+const MAX_QUEUE = parseInt(process.env.PASSWORD_QUEUE_MAX || '100', 10)
+
+// Evaluated inline so the worker does not depend on how Next bundles files;
+// bcryptjs is resolved from node_modules at runtime
+const WORKER_SOURCE = `
+const { parentPort } = require('worker_threads')
+const bcrypt = require('bcryptjs')
+parentPort.on('message', ({ op, args }) => {
+  try {
+    const result = op === 'hash' ? bcrypt.hashSync(args[0], args[1]) : bcrypt.compareSync(args[0], args[1])
+    parentPort.postMessage({ result })
+  } catch (error) {
+    parentPort.postMessage({ error: error.message })
+  }
+})
+`
+
+// Thrown when the queue is full; callers should answer 503
+export class PasswordPoolBusyError extends Error {
+  constructor() {
+    super('Password hashing queue is full')
+    this.name = 'PasswordPoolBusyError'
+  }
+}
+
+// Bounded pool of worker threads running bcrypt off the event loop. Jobs
+// beyond the pool size wait in a FIFO queue of at most MAX_QUEUE entries.
+class PasswordPool {
+  constructor({ size, maxQueue }) {
+    this.size = size
+    this.maxQueue = maxQueue
+    this.idle = []
+    this.workers = 0
+    this.queue = []
+    this.disabled = false
+    this.stats = { completed: 0, failed: 0, rejected: 0, totalWaitMs: 0, maxWaitMs: 0 }
+  }
+
+  run(op, args) {
+    if (this.disabled) {
+      return op === 'hash' ? bcrypt.hash(args[0], args[1]) : bcrypt.compare(args[0], args[1])
+    }
+    if (this.queue.length >= this.maxQueue) {
+      this.stats.rejected++
+      return Promise.reject(new PasswordPoolBusyError())
+    }
+    return new Promise((resolve, reject) => {
+      this.queue.push({ op, args, resolve, reject, queuedAt: Date.now() })
+      this.dispatch()
+    })
+  }
+
+  dispatch() {
+    while (this.queue.length) {
+      let worker = this.idle.pop()
+      if (!worker) {
+        if (this.workers >= this.size) return
+        worker = this.spawn()
+        if (!worker) return
+      }
+      this.execute(worker, this.queue.shift())
+    }
+  }
+
+  spawn() {
+    try {
+      const worker = new Worker(WORKER_SOURCE, { eval: true })
+      worker.unref()
+      worker.ready = false
+      worker.on('error', (error) => this.crash(worker, error))
+      worker.on('exit', () => this.crash(worker, new Error('Password worker exited')))
+      this.workers++
+      return worker
+    } catch (error) {
+      this.fallback(error)
+      return null
+    }
+  }
+
+  execute(worker, job) {
+    const waited = Date.now() - job.queuedAt
+    this.stats.totalWaitMs += waited
+    this.stats.maxWaitMs = Math.max(this.stats.maxWaitMs, waited)
+
+    worker.job = job
+    worker.once('message', ({ result, error }) => {
+      worker.job = null
+      worker.ready = true
+      if (error) {
+        this.stats.failed++
+        job.reject(new Error(error))
+      } else {
+        this.stats.completed++
+        job.resolve(result)
+      }
+      this.idle.push(worker)
+      this.dispatch()
+    })
+    worker.postMessage({ op: job.op, args: job.args })
+  }
+
+  crash(worker, error) {
+    if (worker.dead) return
+    worker.dead = true
+    this.workers--
+    this.idle = this.idle.filter((candidate) => candidate !== worker)
+    if (worker.job) {
+      this.queue.unshift(worker.job)
+      worker.job = null
+    }
+    // A worker that never completed a job cannot load bcryptjs; stop trying
+    if (!worker.ready) {
+      this.fallback(error)
+      return
+    }
+    this.dispatch()
+  }
+
+  // Run bcrypt in-process from now on, draining anything already queued
+  fallback(error) {
+    console.error('Password worker pool unavailable, hashing in-process:', error)
+    this.disabled = true
+    for (const job of this.queue.splice(0)) {
+      this.run(job.op, job.args).then(job.resolve, job.reject)
+    }
+  }
+
+  snapshot() {
+    const finished = this.stats.completed + this.stats.failed
+    return {
+      size: this.size,
+      workers: this.workers,
+      busy: this.workers - this.idle.length,
+      queued: this.queue.length,
+      maxQueue: this.maxQueue,
+      inProcess: this.disabled,
+      ...this.stats,
+      avgWaitMs: finished ? this.stats.totalWaitMs / finished : 0
+    }
+  }
+}
+
+const pool = new PasswordPool({ size: POOL_SIZE, maxQueue: MAX_QUEUE })
+
+export function hashPassword(password) {
+  return pool.run('hash', [password, BCRYPT_ROUNDS])
+}
+
+export function comparePassword(password, hash) {
+  return pool.run('compare', [password, hash])
+}
+
+export function passwordPoolStats() {
+  return pool.snapshot()
+}
@@ -0,0 +1,330 @@
+import { v4 as uuidv4 } from 'uuid'
+import { recordUsage } from '@/lib/analytics'
+import { publishReservationEvent } from '@/lib/events'
+import { getResourceCatalog } from '@/lib/resources'
+import {
+  MAX_AVAILABILITY_DAYS,
+  MAX_DURATION_HOURS,
+  claimInterval,
+  parseTimeBound,
+  releaseIntervals,
+  toDateString,
+  toDateTimeString
+} from '@/lib/reservations'
+
+// Resource type booked through the waitlist
+export const QUEUED_RESOURCE_TYPE = 'supercomputer'
+
+const MAX_WAITING_PER_USER = parseInt(process.env.QUEUE_MAX_PER_USER || '10', 10)
+// Fair share compares the supercomputer hours each user booked from this
+// many days ago onwards
+const FAIR_SHARE_DAYS = parseInt(process.env.QUEUE_FAIR_SHARE_DAYS || '30', 10)
+const MAX_PLACEMENT_ATTEMPTS = 3
+
+const MINUTES_PER_DAY = 24 * 60
+
+function nowMinutes() {
+  return Math.floor(Date.now() / 60000)
+}
+
+// Free time of one resource between two bounds, as sorted, disjoint
+// [start, end) gaps searched by binary search
+export class FreeSlots {
+  constructor(from, to, busy) {
+    this.gaps = []
+    let cursor = from
+    for (const { start, end } of busy) {
+      if (start > cursor) this.gaps.push([cursor, Math.min(start, to)])
+      cursor = Math.max(cursor, end)
+      if (cursor >= to) break
+    }
+    if (cursor < to) this.gaps.push([cursor, to])
+  }
+
+  // Index of the first gap ending after `time`
+  indexAfter(time) {
+    let low = 0
+    let high = this.gaps.length
+    while (low < high) {
+      const middle = (low + high) >> 1
+      if (this.gaps[middle][1] <= time) {
+        low = middle + 1
+      } else {
+        high = middle
+      }
+    }
+    return low
+  }
+
+  // Earliest start of `length` free minutes within [from, to), or null
+  firstFit(length, from, to) {
+    for (let i = this.indexAfter(from); i < this.gaps.length; i++) {
+      const [gapStart, gapEnd] = this.gaps[i]
+      const start = Math.max(gapStart, from)
+      if (start + length > to) break
+      if (start + length <= gapEnd) return start
+    }
+    return null
+  }
+
+  // Remove [start, end), which must lie within one gap
+  take(start, end) {
+    const i = this.indexAfter(start)
+    const [gapStart, gapEnd] = this.gaps[i]
+    const pieces = []
+    if (gapStart < start) pieces.push([gapStart, start])
+    if (end < gapEnd) pieces.push([end, gapEnd])
+    this.gaps.splice(i, 1, ...pieces)
+  }
+}
+
+// Validate a waitlist request: `duration` hours somewhere between `from` and
+// `to` (YYYY-MM-DD or YYYY-MM-DDTHH:MM). Returns the window in epoch minutes
+// or an error message.
+export function validateQueueRequest({ duration, from, to }) {
+  if (!duration || !from || !to) {
+    return { error: 'duration, from and to are required' }
+  }
+  const minutes = Math.round(parseFloat(duration) * 60)
+  const windowStart = Math.max(parseTimeBound(from), nowMinutes())
+  const windowEnd = parseTimeBound(to, true)
+  if (!Number.isFinite(windowStart) || !Number.isFinite(windowEnd)) {
+    return { error: 'Valid from and to are required (YYYY-MM-DD or YYYY-MM-DDTHH:MM)' }
+  }
+  if (!(minutes > 0) || minutes > MAX_DURATION_HOURS * 60) {
+    return { error: 'Invalid duration' }
+  }
+  if (windowEnd - windowStart < minutes) {
+    return { error: 'The window is shorter than the duration or already over' }
+  }
+  if (windowEnd - windowStart > MAX_AVAILABILITY_DAYS * MINUTES_PER_DAY) {
+    return { error: `Window cannot exceed ${MAX_AVAILABILITY_DAYS} days` }
+  }
+  return { minutes, windowStart, windowEnd }
+}
+
+// Add a request to the waitlist of a queued resource and try to place it
+// right away. Returns the stored request, with `reservation` when placed, or
+// { error } when the user already has too many waiting requests.
+export async function enqueueRequest(db, user, { resourceId, duration, minutes, windowStart, windowEnd }) {
+  const requests = db.collection('reservation_requests')
+  const waiting = await requests.countDocuments({ userId: user.id, status: 'waiting' })
+  if (waiting >= MAX_WAITING_PER_USER) {
+    return { error: `At most ${MAX_WAITING_PER_USER} waiting requests per user` }
+  }
+
+  const request = {
+    id: uuidv4(),
+    userId: user.id,
+    resourceId,
+    duration: String(duration),
+    minutes,
+    windowStart,
+    windowEnd,
+    from: toDateTimeString(windowStart),
+    to: toDateTimeString(windowEnd),
+    status: 'waiting',
+    createdAt: new Date()
+  }
+  await requests.insertOne(request)
+  await scheduleResource(db, resourceId)
+
+  return findRequest(db, request.id)
+}
+
+// A waitlist request with its reservation, if placed
+export async function findRequest(db, id) {
+  const request = await db.collection('reservation_requests').findOne({ id }, { projection: { _id: 0 } })
+  if (request?.reservationId) {
+    request.reservation = await db.collection('reservations').findOne(
+      { id: request.reservationId },
+      { projection: { _id: 0 } }
+    )
+  }
+  return request
+}
+
+// Reservations of a resource overlapping [from, to), in start order
+async function busyIntervals(db, resourceId, from, to) {
+  return db.collection('reservations')
+    .find(
+      {
+        resourceId,
+        date: { $gte: toDateString(from - MAX_DURATION_HOURS * 60), $lte: toDateString(to - 1) },
+        start: { $lt: to },
+        end: { $gt: from }
+      },
+      { projection: { _id: 0, start: 1, end: 1 } }
+    )
+    .sort({ start: 1 })
+    .toArray()
+}
+
+// Queued-resource minutes booked by each user since FAIR_SHARE_DAYS ago,
+// read from the usage rollups
+async function fairShareUsage(db, userIds) {
+  const catalog = await getResourceCatalog(db)
+  const resourceIds = catalog.resources
+    .filter((resource) => resource.type === QUEUED_RESOURCE_TYPE)
+    .map((resource) => resource.id)
+  const usage = new Map(userIds.map((userId) => [userId, 0]))
+
+  const documents = await db.collection('usage_daily')
+    .find(
+      { resourceId: { $in: resourceIds }, date: { $gte: toDateString(nowMinutes() - FAIR_SHARE_DAYS * MINUTES_PER_DAY) } },
+      { projection: Object.fromEntries(userIds.map((userId) => [`users.${userId}`, 1])) }
+    )
+    .toArray()
+  for (const document of documents) {
+    for (const [userId, minutes] of Object.entries(document.users || {})) {
+      usage.set(userId, usage.get(userId) + minutes)
+    }
+  }
+  return usage
+}
+
+// Book `request` at `start`: claim the ledger, mark the request placed (it
+// may have been cancelled meanwhile), then insert the reservation. Returns
+// { reservation }, or { lost: 'slot' } when the slot was taken meanwhile and
+// { lost: 'request' } when the request is no longer waiting.
+async function placeRequest(db, request, start) {
+  const reservation = {
+    id: uuidv4(),
+    userId: request.userId,
+    resourceId: request.resourceId,
+    date: toDateString(start),
+    startTime: toDateTimeString(start).slice(11),
+    duration: request.duration,
+    start,
+    end: start + request.minutes,
+    createdAt: new Date(),
+    requestId: request.id
+  }
+
+  if (!await claimInterval(db, reservation)) {
+    return { lost: 'slot' }
+  }
+
+  const requests = db.collection('reservation_requests')
+  const { modifiedCount } = await requests.updateOne(
+    { id: request.id, status: 'waiting' },
+    { $set: { status: 'allocated', reservationId: reservation.id, allocatedAt: new Date() } }
+  )
+  if (!modifiedCount) {
+    await releaseIntervals(db, [reservation])
+    return { lost: 'request' }
+  }
+
+  try {
+    await db.collection('reservations').insertOne(reservation)
+  } catch (error) {
+    await releaseIntervals(db, [reservation])
+    await requests.updateOne(
+      { id: request.id },
+      { $set: { status: 'waiting' }, $unset: { reservationId: '', allocatedAt: '' } }
+    )
+    throw error
+  }
+  await recordUsage(db, [reservation])
+  publishReservationEvent('reservation.created', reservation)
+  return { reservation }
+}
+
+// Place as many waiting requests of one resource as fit. Users take turns
+// by fair share: the user with the fewest booked hours goes next with their
+// oldest request, at the earliest free slot in its window.
+async function allocate(db, resourceId) {
+  const requests = db.collection('reservation_requests')
+  const now = nowMinutes()
+  await requests.updateMany(
+    { resourceId, status: 'waiting', windowEnd: { $lte: now } },
+    { $set: { status: 'expired' } }
+  )
+
+  const waiting = await requests
+    .find({ resourceId, status: 'waiting' }, { projection: { _id: 0 } })
+    .sort({ createdAt: 1 })
+    .toArray()
+  if (!waiting.length) {
+    return []
+  }
+
+  const from = Math.max(now, Math.min(...waiting.map((request) => request.windowStart)))
+  const to = Math.max(...waiting.map((request) => request.windowEnd))
+  let slots = new FreeSlots(from, to, await busyIntervals(db, resourceId, from, to))
+
+  const queues = new Map()
+  for (const request of waiting) {
+    if (!queues.has(request.userId)) queues.set(request.userId, [])
+    queues.get(request.userId).push(request)
+  }
+  const usage = await fairShareUsage(db, [...queues.keys()])
+
+  const placed = []
+  while (queues.size) {
+    let userId = null
+    for (const [candidate, queue] of queues) {
+      if (userId === null ||
+        usage.get(candidate) < usage.get(userId) ||
+        (usage.get(candidate) === usage.get(userId) && queue[0].createdAt < queues.get(userId)[0].createdAt)) {
+        userId = candidate
+      }
+    }
+    const queue = queues.get(userId)
+    const request = queue.shift()
+    if (!queue.length) queues.delete(userId)
+
+    for (let attempt = 0; attempt < MAX_PLACEMENT_ATTEMPTS; attempt++) {
+      const start = slots.firstFit(request.minutes, Math.max(request.windowStart, now), request.windowEnd)
+      if (start === null) break
+
+      const { reservation, lost } = await placeRequest(db, request, start)
+      if (reservation) {
+        slots.take(reservation.start, reservation.end)
+        usage.set(userId, usage.get(userId) + request.minutes)
+        placed.push(reservation)
+        break
+      }
+      // Cancelled or placed elsewhere; nothing left to retry
+      if (lost === 'request') break
+      // Booked directly or by another node in the meantime; re-read
+      slots = new FreeSlots(from, to, await busyIntervals(db, resourceId, from, to))
+    }
+  }
+  return placed
+}
+
+const scheduling = new Map()
+
+// Run the scheduler for one resource. Runs for the same resource are
+// serialized within the process; the ledger guards against other nodes.
+// Resolves with the reservations placed.
+export function scheduleResource(db, resourceId) {
+  const previous = scheduling.get(resourceId) || Promise.resolve()
+  const run = previous
+    .then(() => allocate(db, resourceId))
+    .catch((error) => {
+      console.error('Waitlist scheduling failed:', error)
+      return []
+    })
+  scheduling.set(resourceId, run)
+  run.then(() => {
+    if (scheduling.get(resourceId) === run) scheduling.delete(resourceId)
+  })
+  return run
+}
+
+// Offer the time freed by removed or moved reservations to the waitlist, in
+// the background
+export function promoteWaitlist(db, reservations) {
+  getResourceCatalog(db)
+    .then((catalog) => {
+      const resourceIds = new Set(reservations.map((reservation) => reservation.resourceId))
+      for (const resourceId of resourceIds) {
+        if (catalog.byId.get(resourceId)?.type === QUEUED_RESOURCE_TYPE) {
+          scheduleResource(db, resourceId)
+        }
+      }
+    })
+    .catch((error) => console.error('Waitlist promotion failed:', error))
+}
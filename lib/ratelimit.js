@@ -0,0 +1,86 @@
+import http from 'http'
+import { LruCache } from '@/lib/cache'
+
+// Fixed-window counter per key. Windows live in a bounded LRU so a flood of
+// distinct keys cannot grow memory without limit.
+export class RateLimiter {
+  constructor({ limit, windowMs, maxKeys = 10000 }) {
+    this.limit = limit
+    this.windowMs = windowMs
+    this.windows = new LruCache({ max: maxKeys, ttl: windowMs })
+    this.blocked = 0
+  }
+
+  // Count one hit against `key`; returns whether it is allowed and, if not,
+  // how many seconds remain until the window resets
+  hit(key) {
+    const now = Date.now()
+    let window = this.windows.get(key)
+    if (!window) {
+      window = { count: 0, resetAt: now + this.windowMs }
+      this.windows.set(key, window)
+    }
+    window.count++
+
+    if (window.count > this.limit) {
+      this.blocked++
+      return { allowed: false, retryAfter: Math.ceil((window.resetAt - now) / 1000) }
+    }
+    return { allowed: true, retryAfter: 0 }
+  }
+
+  // Same as hit() without counting, for limits that only count failures
+  check(key) {
+    const window = this.windows.get(key)
+    if (window && window.count >= this.limit) {
+      return { allowed: false, retryAfter: Math.ceil((window.resetAt - Date.now()) / 1000) }
+    }
+    return { allowed: true, retryAfter: 0 }
+  }
+
+  reset(key) {
+    this.windows.delete(key)
+  }
+
+  stats() {
+    return { limit: this.limit, windowMs: this.windowMs, tracked: this.windows.stats().size, blocked: this.blocked }
+  }
+}
+
+// Header carrying the address of the socket a request arrived on. It is
+// set on every request by recordPeerAddresses, overwriting any value the
+// client sent.
+const PEER_ADDRESS_HEADER = 'x-peer-address'
+
+// Number of reverse proxies in front of the app that append to
+// X-Forwarded-For; 0 means clients connect directly
+const TRUST_PROXY_HOPS = parseInt(process.env.TRUST_PROXY_HOPS || '0', 10)
+
+// Stamp the socket address of each incoming HTTP request into
+// PEER_ADDRESS_HEADER. Route handlers cannot see the socket, and Next keeps
+// a client-supplied X-Forwarded-For, so this is the only address a client
+// cannot forge. Called once per server process from instrumentation.js.
+export function recordPeerAddresses() {
+  const emit = http.Server.prototype.emit
+  if (emit.recordsPeerAddress) return
+
+  const patched = function (event, request, ...args) {
+    if (event === 'request') {
+      request.headers[PEER_ADDRESS_HEADER] = request.socket?.remoteAddress || ''
+    }
+    return emit.call(this, event, request, ...args)
+  }
+  patched.recordsPeerAddress = true
+  http.Server.prototype.emit = patched
+}
+
+// Client address: the socket address, or with TRUST_PROXY_HOPS proxies in
+// front the X-Forwarded-For entry appended by the outermost trusted proxy.
+// Entries to the left of it are client-controlled and never used.
+export function clientIp(request) {
+  const forwarded = TRUST_PROXY_HOPS > 0
+    ? (request.headers.get('x-forwarded-for') || '').split(',').map((entry) => entry.trim()).filter(Boolean)
+    : []
+  const chain = [...forwarded, request.headers.get(PEER_ADDRESS_HEADER) || request.ip]
+  return chain[Math.max(0, chain.length - 1 - TRUST_PROXY_HOPS)] || 'unknown'
+}
@@ -0,0 +1,462 @@
+import { keysetFilter, paginate } from '@/lib/pagination'
+import { getResourceCatalog } from '@/lib/resources'
+
+const MINUTES_PER_DAY = 24 * 60
+
+export const MAX_DURATION_HOURS = 24
+export const MAX_AVAILABILITY_DAYS = 31
+export const MAX_BULK_SLOTS = 100
+
+// Minutes since the epoch for a reservation date (YYYY-MM-DD) and start
+// time (HH:MM). Wall-clock times are read as UTC so stored values do not
+// depend on the server timezone or DST. NaN unless the date exists in the
+// calendar and the time is within the day: Date.parse rolls 2026-02-30 over
+// to March and accepts 24:00, which would store a date field that does not
+// match the interval.
+export function toEpochMinutes(date, time) {
+  if (!/^\d{4}-\d{2}-\d{2}$/.test(date) || !/^([01]\d|2[0-3]):[0-5]\d$/.test(time)) {
+    return NaN
+  }
+  const minutes = Date.parse(`${date}T${time}:00Z`) / 60000
+  return Number.isFinite(minutes) && toDateString(minutes) === date ? minutes : NaN
+}
+
+// Date (YYYY-MM-DD) an epoch minute falls on
+export function toDateString(minutes) {
+  return new Date(minutes * 60000).toISOString().slice(0, 10)
+}
+
+// YYYY-MM-DDTHH:MM wall-clock time of an epoch minute
+export function toDateTimeString(minutes) {
+  return new Date(minutes * 60000).toISOString().slice(0, 16)
+}
+
+// Parse a YYYY-MM-DD or YYYY-MM-DDTHH:MM query bound into epoch minutes. A
+// bare date used as an upper bound means the end of that day.
+export function parseTimeBound(value, endOfDay = false) {
+  const [date, time] = (value || '').split('T')
+  const minutes = toEpochMinutes(date, time || '00:00')
+  return !time && endOfDay ? minutes + MINUTES_PER_DAY : minutes
+}
+
+// Numeric [start, end) interval of a reservation, in epoch minutes
+export function reservationInterval(date, startTime, duration) {
+  const start = toEpochMinutes(date, startTime)
+  const end = start + Math.round(parseFloat(duration) * 60)
+  return { start, end }
+}
+
+// Validate a requested slot; returns its interval or an error message
+export function validateSlot({ date, startTime, duration }) {
+  if (!date || !startTime || !duration) {
+    return { error: 'All fields are required' }
+  }
+  const { start, end } = reservationInterval(date, startTime, duration)
+  if (!Number.isFinite(start)) {
+    return { error: 'Invalid date or start time' }
+  }
+  if (!(end > start) || end - start > MAX_DURATION_HOURS * 60) {
+    return { error: 'Invalid duration' }
+  }
+  return { start, end }
+}
+
+// Expand a daily or weekly recurrence into slots. Occurrences stop after
+// `count` or on `until` (inclusive), and never exceed MAX_BULK_SLOTS.
+export function expandRecurrence({ date, startTime, duration, frequency, interval = 1, count, until }) {
+  const step = { daily: 1, weekly: 7 }[frequency] * Math.max(1, parseInt(interval, 10) || 1)
+  const first = toEpochMinutes(date, '00:00')
+  if (!step || !Number.isFinite(first) || (!count && !until)) {
+    return null
+  }
+
+  const last = until ? toEpochMinutes(until, '00:00') : Infinity
+  const limit = Math.min(parseInt(count, 10) || MAX_BULK_SLOTS + 1, MAX_BULK_SLOTS + 1)
+  const slots = []
+  for (let day = first; slots.length < limit && day <= last; day += step * MINUTES_PER_DAY) {
+    slots.push({ date: toDateString(day), startTime, duration })
+  }
+  return slots
+}
+
+// Dates touched by the [start, end) interval
+function datesBetween(start, end) {
+  const dates = []
+  for (let day = Math.floor(start / MINUTES_PER_DAY); day * MINUTES_PER_DAY < end; day++) {
+    dates.push(toDateString(day * MINUTES_PER_DAY))
+  }
+  return dates
+}
+
+// Dates on which a reservation overlapping [start, end) may begin. A
+// reservation lasts at most MAX_DURATION_HOURS, so only the previous day can
+// spill over.
+function candidateDates(start, end) {
+  return datesBetween(start - MAX_DURATION_HOURS * 60, end)
+}
+
+// Check reservation conflicts with a single bounded query on the
+// (resourceId, date, start, end) index
+export async function checkReservationConflict(db, resourceId, date, startTime, duration, excludeReservationId = null) {
+  const { start, end } = reservationInterval(date, startTime, duration)
+
+  const query = {
+    resourceId,
+    date: { $in: candidateDates(start, end) },
+    start: { $lt: end },
+    end: { $gt: start }
+  }
+
+  if (excludeReservationId) {
+    query.id = { $ne: excludeReservationId }
+  }
+
+  const conflict = await db.collection('reservations').findOne(query, { projection: { _id: 1 }, comment: 'checkReservationConflict' })
+  return conflict !== null
+}
+
+// Mark candidates that overlap an existing reservation or an earlier
+// candidate for the same resource. Existing reservations for every candidate
+// are read with one query on the (resourceId, date, start, end) index.
+// Returns the indexes of conflicting candidates.
+export async function findBatchConflicts(db, candidates) {
+  if (!candidates.length) {
+    return new Set()
+  }
+
+  const dates = new Set()
+  for (const { start, end } of candidates) {
+    candidateDates(start, end).forEach((date) => dates.add(date))
+  }
+  const existing = await db.collection('reservations')
+    .find(
+      {
+        resourceId: { $in: [...new Set(candidates.map((candidate) => candidate.resourceId))] },
+        date: { $in: [...dates] },
+        start: { $lt: Math.max(...candidates.map((candidate) => candidate.end)) },
+        end: { $gt: Math.min(...candidates.map((candidate) => candidate.start)) }
+      },
+      { projection: { _id: 0, resourceId: 1, start: 1, end: 1 }, comment: 'findBatchConflicts' }
+    )
+    .toArray()
+
+  const conflicts = new Set()
+  const accepted = []
+  candidates.forEach((candidate, index) => {
+    const overlaps = (other) => other.resourceId === candidate.resourceId &&
+      other.start < candidate.end && other.end > candidate.start
+    if (existing.some(overlaps) || accepted.some(overlaps)) {
+      conflicts.add(index)
+    } else {
+      accepted.push(candidate)
+    }
+  })
+  return conflicts
+}
+
+// Claim the ledger intervals of many reservations in two bulk writes.
+// Reservations must not overlap each other. When some claims lose a race the
+// ledger is read back, partial claims are released, and only fully claimed
+// reservation ids are returned.
+export async function claimIntervals(db, reservations) {
+  const ledger = db.collection('reservation_ledger')
+  const days = new Map()
+  const pushes = []
+
+  const claimedAt = new Date()
+  for (const { id, resourceId, start, end } of reservations) {
+    for (const date of datesBetween(start, end)) {
+      days.set(`${resourceId}|${date}`, { resourceId, date })
+      pushes.push({
+        updateOne: {
+          filter: {
+            resourceId,
+            date,
+            intervals: { $not: { $elemMatch: { start: { $lt: end }, end: { $gt: start } } } }
+          },
+          update: { $push: { intervals: { reservationId: id, start, end, claimedAt } } }
+        }
+      })
+    }
+  }
+
+  if (!pushes.length) {
+    return new Set()
+  }
+
+  await ledger.bulkWrite(
+    [...days.values()].map((filter) => ({
+      updateOne: { filter, update: { $setOnInsert: { intervals: [] } }, upsert: true }
+    })),
+    { ordered: false }
+  )
+  const result = await ledger.bulkWrite(pushes, { ordered: false })
+
+  if (result.modifiedCount === pushes.length) {
+    return new Set(reservations.map((reservation) => reservation.id))
+  }
+
+  const held = new Set()
+  const documents = await ledger.find({ $or: [...days.values()] }).toArray()
+  for (const document of documents) {
+    for (const interval of document.intervals) {
+      held.add(`${interval.reservationId}|${document.date}`)
+    }
+  }
+
+  const claimed = new Set()
+  const partial = []
+  for (const reservation of reservations) {
+    const dates = datesBetween(reservation.start, reservation.end)
+    const count = dates.filter((date) => held.has(`${reservation.id}|${date}`)).length
+    if (count === dates.length) {
+      claimed.add(reservation.id)
+    } else if (count > 0) {
+      partial.push(reservation)
+    }
+  }
+  await releaseIntervals(db, partial)
+  return claimed
+}
+
+// Atomically claim a reservation's interval in the per-resource, per-day
+// ledger. Each day is claimed with one conditional update that only matches
+// when no stored interval of another reservation overlaps, so concurrent
+// overlapping claims cannot both succeed. Intervals the reservation already
+// holds are ignored, which lets an edit claim its new slot before releasing
+// the old one. Returns false (with nothing claimed) on conflict.
+export async function claimInterval(db, { id, resourceId, start, end }) {
+  const ledger = db.collection('reservation_ledger')
+  const claimed = []
+  const claimedAt = new Date()
+
+  for (const date of datesBetween(start, end)) {
+    await ledger.updateOne({ resourceId, date }, { $setOnInsert: { intervals: [] } }, { upsert: true })
+
+    const result = await ledger.updateOne(
+      {
+        resourceId,
+        date,
+        intervals: { $not: { $elemMatch: { reservationId: { $ne: id }, start: { $lt: end }, end: { $gt: start } } } }
+      },
+      { $push: { intervals: { reservationId: id, start, end, claimedAt } } },
+      { comment: 'claimInterval' }
+    )
+
+    if (result.modifiedCount === 0) {
+      if (claimed.length) {
+        await ledger.updateMany(
+          { resourceId, date: { $in: claimed } },
+          { $pull: { intervals: { reservationId: id, start, end } } }
+        )
+      }
+      return false
+    }
+    claimed.push(date)
+  }
+
+  return true
+}
+
+// Release the ledger intervals held by the given reservations; only the
+// exact [start, end) of each is released. Intervals are stored with the time
+// they were claimed, which ledger reconciliation uses as a grace period.
+export async function releaseIntervals(db, reservations) {
+  const operations = reservations
+    .filter((reservation) => Number.isFinite(reservation.start))
+    .map(({ id, resourceId, start, end }) => ({
+      updateMany: {
+        filter: { resourceId, date: { $in: datesBetween(start, end) } },
+        update: { $pull: { intervals: { reservationId: id, start, end } } }
+      }
+    }))
+
+  if (operations.length) {
+    await db.collection('reservation_ledger').bulkWrite(operations, { ordered: false })
+  }
+}
+
+// Ledger intervals younger than this may belong to a booking still being
+// written, and are never reconciled away
+export const LEDGER_GRACE_MINUTES = 10
+
+const RECONCILE_BATCH_SIZE = 500
+
+// Release ledger intervals that no reservation holds: left by a crash or
+// timeout between claiming and writing a reservation, or by a lost race.
+// An interval is kept when a reservation with its id currently has that
+// exact resource and [start, end), or when it was claimed within the grace
+// period. Returns the number of ledger days checked and intervals released.
+export async function reconcileLedger(db, { graceMinutes = LEDGER_GRACE_MINUTES } = {}) {
+  const ledger = db.collection('reservation_ledger')
+  const cutoff = new Date(Date.now() - graceMinutes * 60000)
+  let checked = 0
+  let released = 0
+
+  const reconcileBatch = async (days) => {
+    const ids = [...new Set(days.flatMap((day) => day.intervals.map((interval) => interval.reservationId)))]
+    const held = new Set()
+    const reservations = await db.collection('reservations')
+      .find({ id: { $in: ids } }, { projection: { _id: 0, id: 1, resourceId: 1, start: 1, end: 1 } })
+      .toArray()
+    for (const { id, resourceId, start, end } of reservations) {
+      held.add(`${id}|${resourceId}|${start}|${end}`)
+    }
+
+    const operations = []
+    for (const day of days) {
+      const orphans = day.intervals
+        .filter(({ reservationId, start, end, claimedAt }) =>
+          !held.has(`${reservationId}|${day.resourceId}|${start}|${end}`) && !(claimedAt > cutoff))
+        .map(({ reservationId, start, end, claimedAt }) => (
+          { reservationId, start, end, claimedAt: claimedAt || { $exists: false } }
+        ))
+      if (orphans.length) {
+        operations.push({ updateOne: { filter: { _id: day._id }, update: { $pull: { intervals: { $or: orphans } } } } })
+        released += orphans.length
+      }
+    }
+    if (operations.length) {
+      await ledger.bulkWrite(operations, { ordered: false })
+    }
+  }
+
+  let batch = []
+  for await (const day of ledger.find({ 'intervals.0': { $exists: true } }).batchSize(RECONCILE_BATCH_SIZE)) {
+    batch.push(day)
+    checked++
+    if (batch.length === RECONCILE_BATCH_SIZE) {
+      await reconcileBatch(batch)
+      batch = []
+    }
+  }
+  if (batch.length) {
+    await reconcileBatch(batch)
+  }
+
+  if (released) {
+    console.log(`Released ${released} orphaned ledger intervals`)
+  }
+  return { checked, released }
+}
+
+// Migration: store numeric intervals on reservations created before they
+// existed and register them in the ledger
+export async function backfillReservationIntervals(db) {
+  const pending = await db.collection('reservations')
+    .find({ start: { $exists: false } }, { projection: { id: 1, resourceId: 1, date: 1, startTime: 1, duration: 1 } })
+    .toArray()
+
+  const updates = []
+  const ledgerOperations = []
+
+  for (const reservation of pending) {
+    const { start, end } = reservationInterval(reservation.date, reservation.startTime, reservation.duration)
+    if (!Number.isFinite(start) || !Number.isFinite(end)) continue
+
+    updates.push({ updateOne: { filter: { id: reservation.id }, update: { $set: { start, end } } } })
+
+    for (const date of datesBetween(start, end)) {
+      ledgerOperations.push({
+        updateOne: {
+          filter: { resourceId: reservation.resourceId, date },
+          update: { $setOnInsert: { intervals: [] } },
+          upsert: true
+        }
+      })
+      ledgerOperations.push({
+        updateOne: {
+          filter: { resourceId: reservation.resourceId, date, 'intervals.reservationId': { $ne: reservation.id } },
+          update: { $push: { intervals: { reservationId: reservation.id, start, end } } }
+        }
+      })
+    }
+  }
+
+  if (updates.length) {
+    await db.collection('reservation_ledger').bulkWrite(ledgerOperations)
+    await db.collection('reservations').bulkWrite(updates, { ordered: false })
+    console.log(`Backfilled intervals for ${updates.length} reservations`)
+  }
+}
+
+// Free intervals of at least minDuration minutes within [from, to) for each
+// resource. All reservations in range are read with one query on the
+// (resourceId, date, start, end) index, then swept in start order.
+export async function findAvailability(db, resourceIds, from, to, minDuration = 0) {
+  const reservations = await db.collection('reservations')
+    .find(
+      {
+        resourceId: { $in: resourceIds },
+        date: { $gte: toDateString(from - MAX_DURATION_HOURS * 60), $lte: toDateString(to - 1) },
+        start: { $lt: to },
+        end: { $gt: from }
+      },
+      { projection: { _id: 0, resourceId: 1, start: 1, end: 1 }, comment: 'findAvailability' }
+    )
+    .sort({ start: 1 })
+    .toArray()
+
+  const busy = new Map(resourceIds.map((resourceId) => [resourceId, []]))
+  for (const reservation of reservations) {
+    busy.get(reservation.resourceId).push(reservation)
+  }
+
+  const availability = {}
+  for (const [resourceId, intervals] of busy) {
+    const free = []
+    const addFree = (start, end) => {
+      if (end - start >= Math.max(minDuration, 1)) {
+        free.push({ start: toDateTimeString(start), end: toDateTimeString(end), hours: (end - start) / 60 })
+      }
+    }
+
+    let cursor = from
+    for (const { start, end } of intervals) {
+      if (start > cursor) addFree(cursor, start)
+      cursor = Math.max(cursor, end)
+    }
+    if (cursor < to) addFree(cursor, to)
+
+    availability[resourceId] = free
+  }
+
+  return availability
+}
+
+export const RESERVATION_SORT_FIELDS = ['date', 'startTime', 'id']
+
+// Past reservations moved out of the hot collection by the archive job
+export const ARCHIVE_COLLECTION = 'reservations_archive'
+
+// One page of reservations matching `filter`, with resource details, in
+// (date, startTime, id) order. `from`/`to` bound the date (inclusive) and
+// `after` holds the sort-key values of the previous page's last row.
+// Resources are joined from the cached catalog rather than with $lookup.
+// With `archived` the archive is read instead of the hot collection.
+export async function listReservations(db, filter, { from, to, after, limit, archived = false }) {
+  const match = { ...filter }
+  if (from || to) {
+    match.date = {}
+    if (from) match.date.$gte = from
+    if (to) match.date.$lte = to
+  }
+  if (after) {
+    Object.assign(match, keysetFilter(RESERVATION_SORT_FIELDS, after))
+  }
+
+  const [rows, catalog] = await Promise.all([
+    db.collection(archived ? ARCHIVE_COLLECTION : 'reservations')
+      .find(match, { projection: { _id: 0, archivedAt: 0 }, comment: 'listReservations' })
+      .sort({ date: 1, startTime: 1, id: 1 })
+      .limit(limit + 1)
+      .toArray(),
+    getResourceCatalog(db)
+  ])
+
+  const page = paginate(rows, RESERVATION_SORT_FIELDS, limit)
+  page.items = page.items
+    .filter((reservation) => catalog.byId.has(reservation.resourceId))
+    .map((reservation) => ({ ...reservation, resource: catalog.byId.get(reservation.resourceId) }))
+  return page
+}
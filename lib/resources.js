@@ -0,0 +1,63 @@
+import { createHash } from 'crypto'
+
+// How long a node serves its cached catalog before re-reading the version
+// counter in Mongo
+const REVALIDATE_MS = parseInt(process.env.RESOURCE_CACHE_REVALIDATE_MS || '5000', 10)
+
+let catalog = null
+const stats = { hits: 0, misses: 0, revalidations: 0 }
+
+async function readVersion(db) {
+  const meta = await db.collection('meta').findOne({ _id: 'resources' })
+  return meta ? meta.version : 0
+}
+
+async function loadCatalog(db, version) {
+  const resources = await db.collection('resources').find({}).toArray()
+  const body = JSON.stringify(resources)
+  return {
+    version,
+    resources,
+    body,
+    byId: new Map(resources.map((resource) => [resource.id, resource])),
+    etag: `"${createHash('sha1').update(body).digest('base64url')}"`,
+    checkedAt: Date.now()
+  }
+}
+
+// Resource catalog, cached per process. The cache is revalidated against the
+// version counter in the meta collection at most every REVALIDATE_MS, so
+// other nodes pick up changes without re-reading the collection each time.
+export async function getResourceCatalog(db) {
+  if (catalog && Date.now() - catalog.checkedAt < REVALIDATE_MS) {
+    stats.hits++
+    return catalog
+  }
+
+  const version = await readVersion(db)
+  stats.revalidations++
+  if (catalog && catalog.version === version) {
+    catalog.checkedAt = Date.now()
+    stats.hits++
+    return catalog
+  }
+
+  stats.misses++
+  catalog = await loadCatalog(db, version)
+  return catalog
+}
+
+// Call after any write to the resources collection
+export async function invalidateResources(db) {
+  catalog = null
+  await db.collection('meta').updateOne({ _id: 'resources' }, { $inc: { version: 1 } }, { upsert: true })
+}
+
+export function resourceCacheStats() {
+  const lookups = stats.hits + stats.misses
+  return {
+    version: catalog ? catalog.version : null,
+    ...stats,
+    hitRate: lookups ? stats.hits / lookups : 0
+  }
+}
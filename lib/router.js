@@ -0,0 +1,126 @@
+import { NextResponse } from 'next/server'
+
+function createNode() {
+  return { children: new Map(), param: null, routes: new Map() }
+}
+
+function splitPath(path) {
+  return path.split('/').filter(Boolean)
+}
+
+// Method + path dispatch table, compiled once into a segment trie so lookup
+// cost depends on path depth rather than on the number of routes. Patterns
+// use `:name` segments for path parameters; a static segment wins over a
+// parameter at the same position.
+export class Router {
+  constructor(routes = []) {
+    this.root = createNode()
+    this.hooks = []
+    routes.forEach((route) => this.add(route))
+  }
+
+  add(route) {
+    let node = this.root
+    for (const segment of splitPath(route.path)) {
+      if (segment.startsWith(':')) {
+        const name = segment.slice(1)
+        node.param = node.param || { name, node: createNode() }
+        if (node.param.name !== name) {
+          throw new Error(`Conflicting parameter name :${name} in ${route.path}`)
+        }
+        node = node.param.node
+      } else {
+        if (!node.children.has(segment)) {
+          node.children.set(segment, createNode())
+        }
+        node = node.children.get(segment)
+      }
+    }
+    if (node.routes.has(route.method)) {
+      throw new Error(`Duplicate route ${route.method} ${route.path}`)
+    }
+    node.routes.set(route.method, route)
+  }
+
+  // Node whose pattern matches segments[index..], filling `params`
+  find(node, segments, index, params) {
+    if (index === segments.length) {
+      return node.routes.size ? node : null
+    }
+    const child = node.children.get(segments[index])
+    const found = child && this.find(child, segments, index + 1, params)
+    if (found) {
+      return found
+    }
+    if (node.param) {
+      const paramFound = this.find(node.param.node, segments, index + 1, params)
+      if (paramFound) {
+        params[node.param.name] = segments[index]
+        return paramFound
+      }
+    }
+    return null
+  }
+
+  // { route, params, allowed } for a path, route being null when the path
+  // exists for other methods only; null when nothing matches
+  match(method, path) {
+    const params = {}
+    const node = this.find(this.root, splitPath(path), 0, params)
+    if (!node) {
+      return null
+    }
+    return { route: node.routes.get(method) || null, params, allowed: [...node.routes.keys()] }
+  }
+
+  // Register a hook called after every request with
+  // { method, route, status, durationMs }, route being the matched pattern
+  onComplete(hook) {
+    this.hooks.push(hook)
+  }
+
+  async dispatch(request, path, context = {}) {
+    const started = performance.now()
+    const match = this.match(request.method, path)
+    let response
+
+    if (!match) {
+      response = NextResponse.json({ error: 'Not found' }, { status: 404 })
+    } else if (!match.route) {
+      response = NextResponse.json(
+        { error: 'Method not allowed' },
+        { status: 405, headers: { Allow: match.allowed.join(', ') } }
+      )
+    } else {
+      try {
+        response = await match.route.handler(request, { ...context, params: match.params })
+      } catch (error) {
+        console.error(`${request.method} ${match.route.path} Error:`, error)
+        response = NextResponse.json({ error: 'Internal server error' }, { status: 500 })
+      }
+    }
+
+    const durationMs = performance.now() - started
+    try {
+      response.headers.set('Server-Timing', `app;dur=${durationMs.toFixed(1)}`)
+    } catch (error) {
+      // immutable headers; timing is still reported to the hooks
+    }
+
+    const event = {
+      method: request.method,
+      route: match?.route ? match.route.path : null,
+      status: response.status,
+      durationMs
+    }
+    for (const hook of this.hooks) {
+      try {
+        hook(event, request)
+      } catch (error) {
+        console.error('Route hook error:', error)
+      }
+    }
+
+    return response
+  }
+}
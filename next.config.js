@@ -3,7 +3,9 @@ const nextConfig = {
   output: 'standalone',
   experimental: {
     // Enable static optimization
-    optimizeCss: true
+    optimizeCss: true,
+    // Run instrumentation.js when the server starts
+    instrumentationHook: true
   },
   // Enable source maps in production for debugging
   productionBrowserSourceMaps: false,